@@ -1,4 +1,5 @@
 import { NextResponse } from "next/server"
+import { cacheHeaders } from "@/lib/api-utils"
 
 export async function GET(request: Request, { params }: { params: { id: string } }) {
   try {
@@ -21,7 +22,7 @@ export async function GET(request: Request, { params }: { params: { id: string }
       headers: {
         "Content-Type": "application/json",
       },
-      cache: "no-store", // Disable caching
+      cache: "no-store", // Cached by the CDN according to Django's headers instead
     })
 
     if (!response.ok) {
@@ -29,7 +30,7 @@ export async function GET(request: Request, { params }: { params: { id: string }
     }
 
     const data = await response.json()
-    return NextResponse.json(data)
+    return NextResponse.json(data, { headers: cacheHeaders(response) })
   } catch (error) {
     console.error("Error fetching project:", error)
     return NextResponse.json({ error: "Failed to fetch project" }, { status: 500 })
@@ -1,4 +1,5 @@
 import { NextResponse } from "next/server"
+import { cacheHeaders } from "@/lib/api-utils"
 
 export async function GET(request: Request) {
   try {
@@ -33,7 +34,7 @@ export async function GET(request: Request) {
       headers: {
         "Content-Type": "application/json",
       },
-      cache: "no-store", // Disable caching
+      cache: "no-store", // Cached by the CDN according to Django's headers instead
     })
 
     if (!response.ok) {
@@ -42,7 +43,7 @@ export async function GET(request: Request) {
 
     const data = await response.json()
     console.log("Fetched projects:", data)
-    return NextResponse.json(data)
+    return NextResponse.json(data, { headers: cacheHeaders(response) })
   } catch (error) {
     console.error("Error fetching projects:", error)
     return NextResponse.json({ error: "Failed to fetch projects" }, { status: 500 })
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Database load when 200 concurrent clients hit the same cached project list
+at the moment it becomes unusable, with a plain get-or-set cache versus
+portfolio.cache.cached_data:
+
+- cold: empty cache, e.g. a freshly started worker
+- expired: the entry's timeout passed for everyone at once
+- bumped: a project changed, so the generation and key moved
+
+Uses a temporary SQLite file, as every thread needs its own connection to
+the same database.
+
+    python benchmarks/bench_cache_stampede.py [--clients 200]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from common import setup_django, seed_projects
+
+KEY = 'bench-projects'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--count', type=int, default=2000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'stampede.sqlite3')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    setup_django(memory_db=False)
+
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.db import connection
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from portfolio import cache as data_cache
+    from portfolio.models import Project
+    from portfolio.serializers import ProjectSerializer
+
+    call_command('migrate', verbosity=0)
+    print(f"Seeding {args.count} projects...")
+    seed_projects(args.count)
+    request = Request(APIRequestFactory().get('/api/projects/', HTTP_HOST='localhost'))
+
+    def builder():
+        queryset = Project.objects.prefetch_related('images', 'project_tags__tag').order_by('-date_sort')[:50]
+        return ProjectSerializer(queryset, many=True, context={'request': request}).data
+
+    def plain(key, dependencies, build):
+        versions = '.'.join(str(value) for value in data_cache.generations(dependencies))
+        full_key = f"plain:{key}:{versions}"
+        value = cache.get(full_key)
+        if value is None:
+            value = build()
+            cache.set(full_key, value, 3600)
+        return value
+
+    def protected(key, dependencies, build):
+        return data_cache.cached_data(key, dependencies, build, timeout=3600)
+
+    def expire(fetch):
+        """Warm the entry, then make it expire for every client at once"""
+        fetch(KEY, [data_cache.PROJECTS], builder)
+        versions = '.'.join(str(value) for value in data_cache.generations([data_cache.PROJECTS]))
+        for full_key in (f"plain:{KEY}:{versions}", f"api-data:{KEY}:{versions}"):
+            entry = cache.get(full_key)
+            if entry is None:
+                continue
+            if isinstance(entry, tuple):
+                cache.set(full_key, (entry[0], time.time() - 1, entry[2]), 3600)
+            else:
+                cache.delete(full_key)  # a plain entry simply disappears
+
+    def bump(fetch):
+        fetch(KEY, [data_cache.PROJECTS], builder)
+        data_cache.bump_generations([data_cache.PROJECTS])
+
+    scenarios = [('cold', None), ('expired', expire), ('bumped', bump)]
+
+    def run(fetch):
+        barrier = threading.Barrier(args.clients)
+        lock = threading.Lock()
+        latencies = []
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            with lock:
+                queries[0] += 1
+            return execute(sql, params, many, context)
+
+        def client():
+            barrier.wait()
+            start = time.perf_counter()
+            with connection.execute_wrapper(count):
+                fetch(KEY, [data_cache.PROJECTS], builder)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+            connection.close()
+
+        threads = [threading.Thread(target=client) for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        latencies.sort()
+        return queries[0], statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+    # One build on its own, for scale
+    start = time.perf_counter()
+    builder()
+    print(f"one build: {(time.perf_counter() - start) * 1000:.0f} ms, {args.clients} clients\n")
+
+    print(f"{'scenario':<10}{'cache':<11}{'queries':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for name, prepare in scenarios:
+        for label, fetch in (('plain', plain), ('protected', protected)):
+            cache.clear()
+            if prepare is not None:
+                prepare(fetch)
+            queries, p50, p99 = run(fetch)
+            print(f"{name:<10}{label:<11}{queries:>9}{p50 * 1000:>9.1f}{p99 * 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
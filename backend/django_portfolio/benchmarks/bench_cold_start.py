@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Cold-start report for the serverless entry points: an `-X importtime`
+breakdown by top-level module, and first-request latency measured in a
+fresh interpreter for each profile.
+
+    python benchmarks/bench_cold_start.py [--runs 5] [--path /api/projects/]
+
+Uses DATABASE_URL when set, otherwise a temporary migrated SQLite file.
+"""
+
+import argparse
+import collections
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from common import PROJECT_DIR
+
+PROFILES = [
+    # (label, entry module, settings module)
+    ('full (vercel_wsgi)', 'vercel_wsgi', 'django_portfolio.settings'),
+    ('serverless (vercel_api)', 'vercel_api', 'django_portfolio.settings_serverless'),
+]
+
+IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)')
+
+# Runs in the fresh interpreter: import the entry point, then serve one request
+FIRST_REQUEST_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+module = __import__(sys.argv[1])
+imported = time.perf_counter()
+response = module.handler({'method': 'GET', 'path': sys.argv[2], 'headers': {'host': 'localhost', 'x-forwarded-proto': 'https'}}, None)
+done = time.perf_counter()
+print(json.dumps({'import': imported - start, 'first_request': done - imported, 'status': response['statusCode']}))
+"""
+
+
+def profile_env(settings_module, database_url):
+    env = dict(os.environ)
+    env['DJANGO_SETTINGS_MODULE'] = settings_module
+    env['DATABASE_URL'] = database_url
+    env['PYTHONPATH'] = PROJECT_DIR
+    return env
+
+
+def import_breakdown(entry, env):
+    """Self import time in ms per top-level package, plus the total"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {entry}'],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    totals = collections.Counter()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            totals[match.group(3).split('.')[0]] += int(match.group(1)) / 1000
+    return totals
+
+
+def first_request(entry, path, env):
+    result = subprocess.run(
+        [sys.executable, '-c', FIRST_REQUEST_SCRIPT, entry, path],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/api/projects/')
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args()
+
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        database_file = os.path.join(tempfile.mkdtemp(), 'cold_start.sqlite3')
+        database_url = f'sqlite:///{database_file}'
+        subprocess.run(
+            [sys.executable, 'manage.py', 'migrate', '--verbosity', '0'],
+            cwd=PROJECT_DIR, env=profile_env('django_portfolio.settings', database_url), check=True,
+        )
+
+    summary = []
+    for label, entry, settings_module in PROFILES:
+        env = profile_env(settings_module, database_url)
+        breakdown = import_breakdown(entry, env)
+        print(f"\n== {label}: import time by top-level module (ms, self)")
+        for name, ms in breakdown.most_common(args.top):
+            print(f"  {name:<32}{ms:>8.1f}")
+        print(f"  {'total':<32}{sum(breakdown.values()):>8.1f}")
+
+        runs = [first_request(entry, args.path, env) for _ in range(args.runs)]
+        status = {run['status'] for run in runs}
+        import_ms = statistics.median(run['import'] for run in runs) * 1000
+        request_ms = statistics.median(run['first_request'] for run in runs) * 1000
+        summary.append((label, import_ms, request_ms, status))
+
+    print(f"\n{'profile':<28}{'import ms':>11}{'1st request ms':>16}{'total ms':>10}  status  (median of {args.runs})")
+    for label, import_ms, request_ms, status in summary:
+        print(f"{label:<28}{import_ms:>11.1f}{request_ms:>16.1f}{import_ms + request_ms:>10.1f}  {sorted(status)}")
+
+
+if __name__ == '__main__':
+    main()
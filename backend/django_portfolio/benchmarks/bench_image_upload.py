@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Peak memory and time of checking an uploaded image and removing its
+metadata: a naive full decode and re-encode versus portfolio.images'
+clean_image (header check, then chunk-level stripping), on the large book
+cover PNGs and on a decompression bomb (a 12000x12000 RGBA PNG that is well
+under a megabyte on disk but 576 MB decoded).
+
+Each measurement runs in a fresh interpreter and reports its peak RSS
+above the RSS once the file is read (Linux only: reads /proc/self/status).
+
+    python benchmarks/bench_image_upload.py [images...]
+"""
+
+import argparse
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+import zlib
+
+from common import PROJECT_DIR, setup_django
+
+BOMB_SIZE = 12000
+
+APPROACHES = {
+    # label: what runs in the child
+    'decode + re-encode': 'naive',
+    'clean_image': 'guarded',
+    'clean_image + metadata': 'guarded_metadata',
+}
+
+
+def write_bomb(path, size):
+    """Write a size x size all-zero RGBA PNG, compressing row by row"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    compressor = zlib.compressobj(9)
+    row = b'\x00' * (1 + size * 4)  # filter byte + pixels
+    idat = b''.join(compressor.compress(row) for _ in range(size)) + compressor.flush()
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 6, 0, 0, 0)))
+        f.write(chunk(b'IDAT', idat))
+        f.write(chunk(b'IEND', b''))
+
+
+def memory_kb(field):
+    """VmRSS (current) or VmHWM (peak) of this process"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def reset_peak():
+    # ru_maxrss would include the parent's RSS at fork time; VmHWM can be reset
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def child(approach, path, max_pixels, max_bytes):
+    import io
+    from PIL import Image
+    from portfolio import images
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    upload = io.BytesIO(data)
+    upload.size = len(data)
+    reset_peak()
+    baseline = memory_kb('VmRSS')
+    start = time.perf_counter()
+    try:
+        if approach == 'naive':
+            with Image.open(upload) as image:
+                image.load()
+                buffer = io.BytesIO()
+                image.save(buffer, image.format)
+            output = len(buffer.getvalue())
+        else:
+            cleaned = images.clean_image(upload, os.path.basename(path), max_pixels, max_bytes)
+            output = len(cleaned)
+            if approach == 'guarded_metadata':
+                images.read_metadata(io.BytesIO(cleaned), path)
+        outcome = f"{output:,} bytes"
+    except images.ImageValidationError as e:
+        outcome = f"rejected: {str(e).split(': ', 1)[1][:40]}"
+    elapsed = time.perf_counter() - start
+    peak = memory_kb('VmHWM')
+    print(json.dumps({'peak_mb': max(0, peak - baseline) / 1024, 'ms': elapsed * 1000, 'outcome': outcome}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('images', nargs='*')
+    parser.add_argument('--child', nargs=4, metavar=('APPROACH', 'PATH', 'MAX_PIXELS', 'MAX_BYTES'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        approach, path, max_pixels, max_bytes = args.child
+        child(approach, path, int(max_pixels), int(max_bytes))
+        return
+
+    setup_django()
+    from django.conf import settings
+
+    paths = args.images or [
+        os.path.join(PROJECT_DIR, 'media', 'projects', name)
+        for name in ('BOOK_COVER-11.png', 'BOOK_COVER-12.png')
+    ]
+    bomb = os.path.join(tempfile.mkdtemp(), f'bomb-{BOMB_SIZE}.png')
+    write_bomb(bomb, BOMB_SIZE)
+    paths.append(bomb)
+
+    print(f"caps: {settings.IMAGE_MAX_PIXELS:,} pixels, {settings.IMAGE_MAX_UPLOAD_BYTES:,} bytes\n")
+    print(f"{'image':<26}{'approach':<24}{'peak MB':>9}{'ms':>9}  outcome")
+    from PIL import Image
+    warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+    for path in paths:
+        with Image.open(path) as image:
+            width, height = image.size
+        label = f"{os.path.basename(path)[:13]} {width}x{height}"
+        for approach, mode in APPROACHES.items():
+            result = subprocess.run(
+                [sys.executable, __file__, '--child', mode, path,
+                 str(settings.IMAGE_MAX_PIXELS), str(settings.IMAGE_MAX_UPLOAD_BYTES)],
+                cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+            )
+            run = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{label:<26}{approach:<24}{run['peak_mb']:>9.1f}{run['ms']:>9.0f}  {run['outcome']}")
+
+
+if __name__ == '__main__':
+    main()
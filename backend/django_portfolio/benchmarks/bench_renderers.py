@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Compare DRF's JSONRenderer with the orjson and MessagePack renderers on a
+seeded list of 1,000 projects serialized through ProjectSerializer.
+
+    python benchmarks/bench_renderers.py [--count 1000]
+"""
+
+import argparse
+import gzip
+
+from common import setup_django, seed_projects, best_of
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from portfolio.models import Project
+    from portfolio.serializers import ProjectSerializer
+    from portfolio import renderers
+
+    seed_projects(args.count)
+    request = Request(APIRequestFactory().get('/api/projects/', HTTP_HOST='localhost'))
+    queryset = Project.objects.prefetch_related('images')
+    data = ProjectSerializer(queryset, many=True, context={'request': request}).data
+
+    candidates = [('DRF JSONRenderer', JSONRenderer())]
+    if renderers.orjson is not None:
+        candidates.append(('FastJSONRenderer (orjson)', renderers.FastJSONRenderer()))
+    else:
+        print("orjson not installed; FastJSONRenderer would fall back to the stdlib")
+    if renderers.msgpack is not None:
+        candidates.append(('MessagePackRenderer', renderers.MessagePackRenderer()))
+    else:
+        print("msgpack not installed; skipping MessagePackRenderer")
+
+    print(f"{len(data)} projects, best of {args.repeat} runs\n")
+    print(f"{'renderer':<28}{'encode ms':>11}{'bytes':>11}{'gzip bytes':>12}")
+    baseline = None
+    for name, renderer in candidates:
+        payload = renderer.render(data)
+        seconds = best_of(lambda: renderer.render(data), repeat=args.repeat)
+        baseline = baseline or seconds
+        print(f"{name:<28}{seconds * 1000:>11.2f}{len(payload):>11}{len(gzip.compress(payload)):>12}"
+              f"   x{baseline / seconds:.1f}")
+
+    # The fast renderer must stay byte-for-byte compatible with DRF's
+    if renderers.orjson is not None:
+        import json
+        assert json.loads(renderers.FastJSONRenderer().render(data)) == json.loads(JSONRenderer().render(data))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Compare ?tags= filtering through SQL with the in-process bitmap index on
+100,000 seeded projects: first page plus count, as the paginated list
+endpoint does. The index is timed without its TAG_INDEX_MAX_IDS cap, and
+separately from the endpoint's filter, which falls back to SQL above the
+cap. Also checks all of them return the same projects, including for tag
+names that differ only in case or fold differently outside ASCII.
+
+    python benchmarks/bench_tag_filter.py [--count 100000]
+"""
+
+import argparse
+import time
+
+from common import setup_django, seed_projects, best_of
+
+QUERIES = [
+    (['branding'], 'all'),
+    (['branding', 'print'], 'all'),
+    (['branding', 'print', 'poster'], 'all'),
+    (['logo', 'ui'], 'any'),
+    (['branding', 'print', 'poster', 'logo'], 'any'),
+    (['PRINT'], 'all'),
+    (['Café', 'strasse'], 'any'),
+    (['branding', 'CAFÉ', 'Straße'], 'all'),
+]
+
+# Seeded besides common.TAG_WORDS: a case variant of one of them, and names
+# SQLite's ASCII-only case folding would miss
+CASE_TAGS = ['Print', 'café', 'Straße']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from portfolio.filters import TagFilterBackend
+    from portfolio.models import Project, ProjectTag, Tag
+    from portfolio.tag_index import tag_index, tag_key
+
+    print(f"Seeding {args.count} projects...")
+    seed_projects(args.count, images_per_project=0)
+    project_ids = list(Project.objects.values_list('id', flat=True))
+    for step, tag in enumerate(Tag.objects.bulk_create([Tag(name=name) for name in CASE_TAGS]), start=2):
+        ProjectTag.objects.bulk_create(
+            [ProjectTag(project_id=pk, tag=tag) for pk in project_ids[::step]],
+            batch_size=1000,
+        )
+
+    start = time.perf_counter()
+    tag_index.rebuild()
+    print(f"index rebuild: {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{sum(bits.bit_length() for bits in tag_index.bits.values()) // 8 // 1024} KiB of bitsets\n")
+
+    backend = TagFilterBackend()
+    queryset = Project.objects.order_by('-created_at')
+    factory = APIRequestFactory()
+
+    def page(filtered):
+        return list(filtered[:10].values_list('id', flat=True)), filtered.count()
+
+    print(f"{'tags':<38}{'mode':<6}{'matches':>9}{'sql ms':>9}{'index ms':>10}{'endpoint ms':>13}  endpoint path")
+    for names, mode in QUERIES:
+        request = Request(factory.get('/api/projects/', {'tags': ','.join(names), 'tags_mode': mode}))
+        keys = {tag_key(name) for name in names}
+        sql = lambda: page(backend.filter_sql(queryset, keys, mode))
+        indexed = lambda: page(queryset.filter(id__in=tag_index.match(keys, mode)))
+        endpoint = lambda: page(backend.filter_queryset(request, queryset, None))
+
+        # Same projects through every path
+        expected = set(backend.filter_sql(queryset, keys, mode).values_list('id', flat=True))
+        assert set(tag_index.match(keys, mode)) == expected
+        assert set(backend.filter_queryset(request, queryset, None).values_list('id', flat=True)) == expected
+        assert sql() == indexed() == endpoint()
+
+        sql_seconds = best_of(sql, repeat=args.repeat)
+        index_seconds = best_of(indexed, repeat=args.repeat)
+        endpoint_seconds = best_of(endpoint, repeat=args.repeat)
+        path = 'index' if len(expected) <= settings.TAG_INDEX_MAX_IDS else 'SQL (over TAG_INDEX_MAX_IDS)'
+        print(f"{','.join(names):<38}{mode:<6}{len(expected):>9}{sql_seconds * 1000:>9.1f}"
+              f"{index_seconds * 1000:>10.1f}{endpoint_seconds * 1000:>13.1f}  {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Time the Vercel WSGI bridge on a 5 MB image response, against the
+previous decode-and-join handler.
+
+    python benchmarks/bench_vercel_bridge.py [--size-mb 5]
+"""
+
+import argparse
+import base64
+import io
+import os
+import sys
+import tracemalloc
+
+from common import setup_django, best_of
+
+
+def legacy_handler(application, event):
+    """
+    The handler vercel_wsgi.py used to ship, kept here as the baseline. Its
+    status line came from the first response header; that part is fixed so
+    the body handling can be timed at all.
+    """
+    environ = {
+        'wsgi.input': None,
+        'wsgi.errors': sys.stderr,
+        'REQUEST_METHOD': event.get('method', 'GET'),
+        'PATH_INFO': event.get('path', '/'),
+        'QUERY_STRING': event.get('query', ''),
+    }
+    response_status = []
+    response_headers = []
+    response_body = []
+
+    def start_response(status, headers, exc_info=None):
+        response_status.append(status)
+        response_headers.extend(headers)
+        return response_body.append
+
+    result = application(environ, start_response)
+    for data in result:
+        if isinstance(data, bytes):
+            response_body.append(data.decode('utf-8'))
+        else:
+            response_body.append(data)
+    return {
+        'statusCode': int(response_status[0].split(' ')[0]),
+        'headers': dict(response_headers),
+        'body': ''.join(response_body),
+    }
+
+
+def make_app(payload, content_type, use_file_wrapper):
+    """A WSGI app returning `payload` the way FileResponse or HttpResponse would"""
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', content_type), ('Content-Length', str(len(payload)))])
+        if use_file_wrapper and 'wsgi.file_wrapper' in environ:
+            return environ['wsgi.file_wrapper'](io.BytesIO(payload), 8192)
+        # Same 8 KB blocks Django streams a FileResponse in without a file_wrapper
+        return (payload[i:i + 8192] for i in range(0, len(payload), 8192))
+    return app
+
+
+def measure(label, func, repeat):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seconds = best_of(func, repeat=repeat)
+    print(f"{label:<46}{seconds * 1000:>10.2f}{peak / 2**20:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    import vercel_wsgi
+
+    size = int(args.size_mb * 2**20)
+    image = os.urandom(size)
+    text = b'x' * size
+    event = {'method': 'GET', 'path': '/media/projects/cover.png', 'headers': {'host': 'localhost'}}
+
+    print(f"{args.size_mb:g} MB body, best of {args.repeat} runs\n")
+    print(f"{'case':<46}{'ms':>10}{'peak MiB':>12}")
+
+    image_app = make_app(image, 'image/png', use_file_wrapper=True)
+    try:
+        legacy_handler(image_app, event)
+    except UnicodeDecodeError:
+        print(f"{'legacy handler, binary image':<46}{'fails: UnicodeDecodeError':>22}")
+    measure('bridge, binary image (file_wrapper)', lambda: vercel_wsgi.call_application(image_app, event), args.repeat)
+    chunked_app = make_app(image, 'image/png', use_file_wrapper=False)
+    measure('bridge, binary image (8 KB chunks)', lambda: vercel_wsgi.call_application(chunked_app, event), args.repeat)
+
+    # The old handler only copes with UTF-8, so compare on a text body too
+    text_app = make_app(text, 'text/plain', use_file_wrapper=False)
+    measure('legacy handler, text (8 KB chunks)', lambda: legacy_handler(text_app, event), args.repeat)
+    measure('bridge, text (8 KB chunks)', lambda: vercel_wsgi.call_application(text_app, event), args.repeat)
+
+    result = vercel_wsgi.call_application(image_app, event)
+    assert result['isBase64Encoded'] and base64.b64decode(result['body']) == image
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Shared setup for the benchmark scripts in this directory.
+
+Benchmarks run against a throwaway in-memory SQLite database so they never
+touch real data:
+
+    python benchmarks/bench_renderers.py
+"""
+
+import os
+import random
+import sys
+import time
+
+# Make the Django project importable when run as a script
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+CATEGORIES = ['Print', 'Digital', 'Typography', 'Branding', 'Packaging']
+TAG_WORDS = [
+    'branding', 'print', 'poster', 'logo', 'editorial', 'book cover', 'packaging',
+    'illustration', 'web', 'motion', 'type design', 'identity', 'magazine',
+    'social media', 'ui', 'infographic', 'lettering', 'album art', 'signage', 'stationery',
+]
+
+
+def setup_django(memory_db=True):
+    """Configure Django, optionally on a fresh in-memory database"""
+    if memory_db:
+        os.environ['DATABASE_URL'] = 'sqlite://:memory:'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_portfolio.settings')
+
+    import django
+    django.setup()
+
+    if memory_db:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+
+def seed_projects(count, seed=42, images_per_project=3, tags_per_project=4):
+    """Bulk insert `count` synthetic projects with images and tags"""
+    from portfolio.models import Project, ProjectImage, Tag, ProjectTag
+    from portfolio.utils import parse_display_date
+
+    rng = random.Random(seed)
+    tags = Tag.objects.bulk_create([Tag(name=name) for name in TAG_WORDS])
+
+    projects = []
+    for i in range(count):
+        date = f"{rng.choice(['Jan', 'Mar', 'Jun', 'Sep', 'Nov'])} {rng.randint(2015, 2025)}"
+        date_sort, date_precision = parse_display_date(date)
+        chosen = rng.sample(tags, tags_per_project)
+        projects.append(Project(
+            title=f"Project {i}",
+            slug=f"project-{i}",
+            category=rng.choice(CATEGORIES),
+            description=' '.join(rng.choice(TAG_WORDS) for _ in range(80)),
+            client=f"Client {rng.randint(1, 200)}",
+            date=date,
+            date_sort=date_sort,
+            date_precision=date_precision,
+            featured=rng.random() < 0.1,
+            main_image=f"projects/project-{i}-0.png",
+            tag_names=[tag.name for tag in chosen],
+        ))
+        projects[-1]._seed_tags = chosen
+    Project.objects.bulk_create(projects, batch_size=1000)
+
+    images = []
+    project_tags = []
+    for project in projects:
+        for order in range(images_per_project):
+            images.append(ProjectImage(
+                project=project,
+                image=f"projects/project-{project.slug}-{order}.png",
+                is_main=order == 0,
+                alt_text=f"{project.title} image {order}",
+                order=order,
+            ))
+        project_tags.extend(ProjectTag(project=project, tag=tag) for tag in project._seed_tags)
+    ProjectImage.objects.bulk_create(images, batch_size=1000)
+    ProjectTag.objects.bulk_create(project_tags, batch_size=1000)
+    return projects
+
+
+def best_of(func, repeat=5, number=1):
+    """Best wall time in seconds of `number` calls, over `repeat` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
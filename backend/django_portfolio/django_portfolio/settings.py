@@ -3,6 +3,7 @@ Django settings for django_portfolio project.
 """
 
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 import dj_database_url
@@ -36,9 +37,11 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'portfolio.middleware.APICompressionMiddleware',  # gzip/brotli for API JSON
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add whitenoise for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'portfolio.db_router.ReplicaRoutingMiddleware',  # reads from replicas, pins writers to the primary
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -88,17 +91,106 @@ if os.environ.get('DATABASE_URL'):
         conn_max_age=600
     )
 
-# Cache settings
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Read replicas: comma-separated database URLs, added as replica_1, replica_2,
+# ... Anonymous GETs of the portfolio API read from a healthy replica; see
+# portfolio.db_router. To try it locally with SQLite, copy the database file
+# and point DATABASE_URL and DATABASE_REPLICA_URLS at the two copies.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+for _index, _url in enumerate(DATABASE_REPLICA_URLS, 1):
+    DATABASES[f'replica_{_index}'] = dict(dj_database_url.parse(_url, conn_max_age=600), TEST={'MIRROR': 'default'})
+DATABASE_ROUTERS = ['portfolio.db_router.ReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = 10  # reads of a client that just wrote stay on the primary this long
+DATABASE_REPLICA_HEALTH_CHECK_SECONDS = 15
+DATABASE_REPLICA_MAX_LAG_SECONDS = 5  # PostgreSQL replicas further behind are skipped
+
+# Cache settings. Cache generations (portfolio.cache) invalidate cached data,
+# the tag index and site settings in every worker only through a shared
+# cache; the default per-process cache lets the other workers catch up once
+# the generation counters expire after API_GENERATION_SECONDS.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
     }
-}
+    API_GENERATION_SECONDS = None  # bumps reach every worker at once
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
+    }
+    API_GENERATION_SECONDS = int(os.environ.get('API_GENERATION_SECONDS', 30))
 
 # Cache timeout in seconds (5 minutes)
 CACHE_MIDDLEWARE_SECONDS = 300
 
+# Generation-keyed API data cache (portfolio.cache); entries are also
+# invalidated as soon as a model they were built from changes
+API_DATA_CACHE_SECONDS = 60 * 60
+# Stampede protection for those entries: how long an expired entry may still
+# be served while one request rebuilds it, how long others wait for a build
+# in progress, and how eagerly entries are rebuilt before expiring (XFetch
+# beta; 0 disables early refresh)
+API_DATA_STALE_SECONDS = 5 * 60
+API_DATA_LOCK_SECONDS = 30
+API_DATA_EARLY_REFRESH_BETA = 1.0
+# Project lists include view counts, which don't invalidate the cache
+PROJECT_LIST_CACHE_SECONDS = CACHE_MIDDLEWARE_SECONDS
+
+# Cache-Control of anonymous GETs on public endpoints (portfolio.http_cache).
+# Shared caches may keep responses longer than browsers since they are
+# purged by surrogate key on change; stale copies may be served while
+# revalidating or when Django is down.
+HTTP_CACHE_MAX_AGE = 60
+HTTP_CACHE_SHARED_MAX_AGE = int(os.environ.get('HTTP_CACHE_SHARED_MAX_AGE', 10 * 60))
+HTTP_CACHE_STALE_SECONDS = 24 * 60 * 60
+# Endpoint receiving {"keys": [...]} POSTs to purge when content changes
+CACHE_PURGE_URL = os.environ.get('CACHE_PURGE_URL', '')
+CACHE_PURGE_TOKEN = os.environ.get('CACHE_PURGE_TOKEN', '')
+CACHE_PURGE_TIMEOUT = 2  # seconds
+
+# In-process tag bitmap index behind ?tags= filtering (portfolio.tag_index).
+# Matches beyond TAG_INDEX_MAX_IDS are filtered in SQL instead of a huge IN list.
+TAG_INDEX_ENABLED = os.environ.get('TAG_INDEX_ENABLED', 'True') == 'True'
+TAG_INDEX_MAX_IDS = 10000
+
+# Related projects (portfolio.related): how many to keep per project and how
+# much sharing a category counts next to tag overlap (0..1)
+RELATED_PROJECTS_COUNT = 6
+RELATED_PROJECTS_CATEGORY_WEIGHT = 0.2
+
+# Buffered project view counts (portfolio.counters). Buffers are written
+# after this many views or seconds; serverless deployments, whose processes
+# may be frozen at any time, can set the seconds to 0 to write every view.
+VIEW_COUNT_FLUSH_SIZE = int(os.environ.get('VIEW_COUNT_FLUSH_SIZE', 100))
+VIEW_COUNT_FLUSH_SECONDS = int(os.environ.get('VIEW_COUNT_FLUSH_SECONDS', 30))
+# Forward-decayed popularity: a view counts half as much as one a half-life later
+POPULARITY_HALF_LIFE_DAYS = 14
+POPULARITY_EPOCH = '2025-01-01'
+
+# Rows fetched per round trip by the streaming CSV/NDJSON exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Bulk project import (manage.py import_projects, /api/projects/import/)
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', os.cpu_count() or 1))  # image processes; 1 = in-process
+IMPORT_BATCH_SIZE = 50  # projects per transaction
+# Widths of the WebP derivatives generated for imported images (portfolio.images)
+IMAGE_DERIVATIVE_WIDTHS = [480, 960, 1600]
+# Caps on uploaded and imported images, checked from the file header before
+# decoding: a decoded image takes about 4 bytes per pixel
+IMAGE_MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', 50_000_000))
+IMAGE_MAX_UPLOAD_BYTES = int(os.environ.get('IMAGE_MAX_UPLOAD_BYTES', 30 * 1024 * 1024))
+
+# API response compression (portfolio.middleware.APICompressionMiddleware)
+API_COMPRESSION_PATH_PREFIX = '/api/'
+API_COMPRESSION_MIN_LENGTH = 512  # bytes; smaller bodies aren't worth it
+API_COMPRESSION_CACHE_SECONDS = CACHE_MIDDLEWARE_SECONDS  # for precompressed cached bodies
+
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -156,6 +248,31 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Media is served by portfolio.media.serve_media. MEDIA_SENDFILE hands the
+# transfer to the front server: 'xsendfile' (X-Sendfile) or 'nginx'
+# (X-Accel-Redirect to MEDIA_SENDFILE_PREFIX + name, an internal location
+# aliased to MEDIA_ROOT). Names without a content hash are cached this long.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_SENDFILE_PREFIX = '/protected-media/'
+MEDIA_CACHE_SECONDS = 24 * 60 * 60
+# Uploads get content-hashed names, which are served as immutable. Static
+# files keep Django's default storage, which STORAGES would otherwise drop.
+STORAGES = {
+    'default': {'BACKEND': 'portfolio.media.ContentHashedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Files of deleted images and skills are removed by a background thread once
+# the deletion commits (portfolio.media_cleanup); turn off where processes may
+# be frozen between requests to remove them on commit instead.
+MEDIA_CLEANUP_IN_BACKGROUND = os.environ.get('MEDIA_CLEANUP_IN_BACKGROUND', 'True') == 'True'
+# collect_media_garbage leaves files younger than this alone: uploads are
+# stored before the transaction saving their row commits
+MEDIA_GARBAGE_MIN_AGE_SECONDS = 60 * 60
+
+# Static JSON snapshot of the public API (manage.py export_snapshot)
+SNAPSHOT_ROOT = os.environ.get('SNAPSHOT_ROOT', os.path.join(BASE_DIR, 'snapshot'))
+SNAPSHOT_BASE_URL = os.environ.get('SNAPSHOT_BASE_URL', 'http://localhost:8000')  # for absolute media URLs
+SNAPSHOT_AUTO_EXPORT = os.environ.get('SNAPSHOT_AUTO_EXPORT', 'False') == 'True'  # regenerate on model changes
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -170,8 +287,23 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # orjson-backed; these fall back to the stdlib encoder when orjson is missing
+    'DEFAULT_RENDERER_CLASSES': [
+        'portfolio.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'portfolio.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Offer application/msgpack through content negotiation when msgpack is installed
+if find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'portfolio.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'portfolio.renderers.MessagePackParser')
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
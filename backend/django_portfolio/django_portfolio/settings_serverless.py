@@ -0,0 +1,57 @@
+"""
+Django settings for the API-only serverless function.
+
+Public read-only API calls authenticate with JWTs and never use the admin,
+sessions, messages, CSRF or the browsable API, so this profile drops them
+to cut cold-start time. Everything else comes from the main settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, TEMPLATES, REST_FRAMEWORK
+
+SERVERLESS_EXCLUDED_APPS = {
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+}
+
+SERVERLESS_EXCLUDED_MIDDLEWARE = {
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    # DRF authenticates requests itself; Django's version needs sessions
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+}
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in SERVERLESS_EXCLUDED_APPS]
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in SERVERLESS_EXCLUDED_MIDDLEWARE]
+
+ROOT_URLCONF = 'django_portfolio.urls_api'
+WSGI_APPLICATION = None
+
+# The function may be frozen right after responding, before a background
+# thread gets to run (or recycled without exiting): remove media files and
+# write view counts within the request
+MEDIA_CLEANUP_IN_BACKGROUND = False
+VIEW_COUNT_FLUSH_SECONDS = 0
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {
+        'context_processors': [
+            processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+            if not processor.startswith('django.contrib.messages')
+        ],
+    },
+}]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': [
+        renderer for renderer in REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']
+        if renderer != 'rest_framework.renderers.BrowsableAPIRenderer'
+    ],
+}
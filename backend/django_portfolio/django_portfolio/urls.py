@@ -4,14 +4,14 @@ URL configuration for django_portfolio project.
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework import routers
 from portfolio.views import (
     ProjectViewSet, ProjectImageViewSet, TagViewSet, MessageViewSet,
     SkillViewSet, JourneyViewSet, CustomTokenObtainPairView, LogoutView,
     LogoutAllView, ChangePasswordView, UserViewSet, SiteSettingsView,
-    SessionsView
+    SessionsView, BootstrapView
 )
+from portfolio.media import serve_media
 from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenVerifyView,
@@ -28,6 +28,7 @@ router.register(r'users', UserViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/bootstrap/', BootstrapView.as_view(), name='bootstrap'),
     path('api/', include(router.urls)),
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -39,6 +40,7 @@ urlpatterns = [
     path('api/sessions/', SessionsView.as_view(), name='user_sessions'),
 ]
 
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Media files, in production too (see portfolio.media); skipped when
+# MEDIA_URL points at another host
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns.append(path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", serve_media, name='media'))
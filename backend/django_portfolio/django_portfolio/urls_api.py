@@ -0,0 +1,23 @@
+"""
+URL configuration for the API-only serverless function (see
+settings_serverless). Only the public read endpoints are routed here;
+everything else is served by the full application.
+"""
+from django.urls import path, include
+from rest_framework import routers
+from portfolio.views import (
+    ProjectViewSet, ProjectImageViewSet, TagViewSet, SkillViewSet, JourneyViewSet,
+    BootstrapView
+)
+
+router = routers.DefaultRouter()
+router.register(r'projects', ProjectViewSet)
+router.register(r'project-images', ProjectImageViewSet)
+router.register(r'tags', TagViewSet)
+router.register(r'skills', SkillViewSet)
+router.register(r'journey', JourneyViewSet)
+
+urlpatterns = [
+    path('api/bootstrap/', BootstrapView.as_view(), name='bootstrap'),
+    path('api/', include(router.urls)),
+]
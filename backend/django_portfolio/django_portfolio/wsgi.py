@@ -13,7 +13,9 @@ application = get_wsgi_application()
 
 # Handler for Vercel serverless function
 def handler(event, context):
-    return application(event['headers'], lambda x, y: (x, y, []))
+    # Imported on first use so plain WSGI servers never load it
+    from vercel_wsgi import call_application
+    return call_application(application, event)
 
 # For local development
 if __name__ == '__main__':
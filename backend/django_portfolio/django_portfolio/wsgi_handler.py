@@ -5,4 +5,6 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_portfolio.settings')
 application = get_wsgi_application()
 
 def handler(event, context):
-    return application(event.get('headers', {}), lambda x, y: (x, y, []))
+    # Imported on first use; the bridge lives next to manage.py
+    from vercel_wsgi import call_application
+    return call_application(application, event)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Project, ProjectImage, Tag, ProjectTag, Message, Skill, Journey
+from .models import Project, ProjectImage, Tag, ProjectTag, Message, Skill, Journey, SiteSettings
 
 class ProjectImageInline(admin.TabularInline):
     model = ProjectImage
@@ -45,3 +45,13 @@ class JourneyAdmin(admin.ModelAdmin):
     list_display = ('title', 'subtitle', 'date', 'journey_type', 'order')
     list_filter = ('journey_type',)
     search_fields = ('title', 'subtitle', 'description')
+
+@admin.register(SiteSettings)
+class SiteSettingsAdmin(admin.ModelAdmin):
+    list_display = ('site_title', 'contact_email', 'updated_at')
+
+    def has_add_permission(self, request):
+        return not SiteSettings.objects.exists()
+
+    def has_delete_permission(self, request, obj=None):
+        return False
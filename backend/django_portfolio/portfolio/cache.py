@@ -0,0 +1,204 @@
+"""
+Generation-keyed caching of API data.
+
+Every group of models ("projects", "skills", ...) has a generation counter
+in the cache. Cached data is stored under a key containing the current
+generations of everything it was built from, so bumping one counter when
+a model changes invalidates every dependent entry at once without having
+to know their keys. Stale entries simply expire.
+
+Expensive entries are protected against stampedes:
+
+- Single flight: on a miss, one caller builds the entry while the others
+  wait for it, instead of all running the same queries at once. Threads
+  of one process wait on an event; other processes wait on a lock key in
+  the shared cache.
+- Early refresh: a caller may rebuild an entry shortly before it expires,
+  with a probability rising towards the expiry time and with how long the
+  entry took to build ("XFetch"), so popular entries rarely expire at all.
+- Stale while revalidate: entries are kept API_DATA_STALE_SECONDS past
+  their expiry. One caller rebuilds an expired entry; the rest are served
+  the old copy meanwhile.
+
+Bumped generations are not served stale: they change the key, so the next
+read is a plain (single flight) miss.
+
+Generations only reach every worker through a cache they all share
+(REDIS_URL). With the default per-process cache, a bump is seen by the
+process that made it alone, so counters there expire after
+API_GENERATION_SECONDS: the other processes then start a new generation
+and pick up the change within that time.
+"""
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .db_router import read_primary
+
+GENERATION_KEY = 'api-generation:{}'
+LOCK_KEY = 'api-lock:{}'
+LOCK_POLL_SECONDS = 0.02
+
+# Generation groups bumped when instances of a model change. Project
+# images and tag assignments are part of the serialized project, and tag
+# names are denormalized onto projects.
+PROJECTS = 'projects'
+TAGS = 'tags'
+SKILLS = 'skills'
+JOURNEY = 'journey'
+SITE_SETTINGS = 'site-settings'
+MODEL_GENERATIONS = {
+    'project': (PROJECTS,),
+    'projectimage': (PROJECTS,),
+    'projecttag': (PROJECTS,),
+    'tag': (PROJECTS, TAGS),
+    'skill': (SKILLS,),
+    'journey': (JOURNEY,),
+    'sitesettings': (SITE_SETTINGS,),
+}
+
+
+def new_generation():
+    """
+    Starting value for a missing counter. Time based, so a counter that was
+    evicted never restarts at a value older entries were stored under.
+    """
+    return int(time.time() * 1000)
+
+
+def start_generation(key):
+    """Store a fresh counter under `key`; add() so a concurrent bump isn't reset"""
+    value = new_generation()
+    if not cache.add(key, value, timeout=settings.API_GENERATION_SECONDS):
+        value = cache.get(key, value)
+    return value
+
+
+def generations(names):
+    """Current generation of each name"""
+    keys = [GENERATION_KEY.format(name) for name in names]
+    found = cache.get_many(keys)
+    result = []
+    for key in keys:
+        value = found.get(key)
+        if value is None:
+            value = start_generation(key)
+        result.append(value)
+    return result
+
+
+def bump_generations(names):
+    """Invalidate everything cached from the given generation groups"""
+    for name in names:
+        key = GENERATION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Counter evicted, expired or never read
+            cache.set(key, new_generation(), timeout=settings.API_GENERATION_SECONDS)
+
+
+class Flight:
+    """A build in progress in this process, waited on by the other threads"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_flights = {}  # full key -> Flight
+_flights_lock = threading.Lock()
+
+
+def cached_data(key, dependencies, builder, timeout=None):
+    """
+    Return builder() cached under `key` until any generation in
+    `dependencies` is bumped or `timeout` seconds pass.
+    """
+    if timeout is None:
+        timeout = settings.API_DATA_CACHE_SECONDS
+    # Never from a replica: the generations may already count writes it lacks
+    builder = read_primary(builder)
+    versions = '.'.join(str(value) for value in generations(dependencies))
+    full_key = f"api-data:{key}:{versions}"
+    entry = cache.get(full_key)
+    if entry is None:
+        return build_once(full_key, builder, timeout)
+
+    value, expires, build_time = entry
+    # XFetch: -log(u) is exponentially distributed, so the chance of an early
+    # refresh grows smoothly as expiry nears, faster for slow builds
+    early = -build_time * settings.API_DATA_EARLY_REFRESH_BETA * math.log(1 - random.random())
+    if time.time() + early < expires:
+        return value
+    # Due (or past due): one caller rebuilds, the others keep the copy they have
+    if not cache.add(LOCK_KEY.format(full_key), True, settings.API_DATA_LOCK_SECONDS):
+        return value
+    try:
+        return build(full_key, builder, timeout)
+    finally:
+        cache.delete(LOCK_KEY.format(full_key))
+
+
+def build(full_key, builder, timeout):
+    started = time.time()
+    value = builder()
+    now = time.time()
+    # Kept past expiry so it can be served stale during the rebuild
+    cache.set(full_key, (value, now + timeout, now - started), timeout + settings.API_DATA_STALE_SECONDS)
+    return value
+
+
+def build_once(full_key, builder, timeout):
+    """Build a missing entry, coalescing concurrent builds of the same key"""
+    with _flights_lock:
+        flight = _flights.get(full_key)
+        leader = flight is None
+        if leader:
+            flight = _flights[full_key] = Flight()
+
+    if not leader:
+        if flight.done.wait(settings.API_DATA_LOCK_SECONDS):
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        # The build is taking too long to keep waiting for
+        return builder()
+
+    try:
+        flight.value = build_shared(full_key, builder, timeout)
+        return flight.value
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[full_key]
+        flight.done.set()
+
+
+def build_shared(full_key, builder, timeout):
+    """Build an entry unless another process already is, then wait for theirs"""
+    lock_key = LOCK_KEY.format(full_key)
+    deadline = time.monotonic() + settings.API_DATA_LOCK_SECONDS
+    while not cache.add(lock_key, True, settings.API_DATA_LOCK_SECONDS):
+        time.sleep(LOCK_POLL_SECONDS)
+        entry = cache.get(full_key)
+        if entry is not None:
+            return entry[0]
+        if time.monotonic() >= deadline:
+            return builder()
+    try:
+        return build(full_key, builder, timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def request_cache_key(request):
+    """Cache key part for a request: absolute URLs in the data depend on host and scheme"""
+    return request.build_absolute_uri()
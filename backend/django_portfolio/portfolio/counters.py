@@ -0,0 +1,123 @@
+"""
+Write-behind project view counters.
+
+Views are buffered in process memory and written in one batched UPDATE:
+
+    UPDATE project SET views = views + CASE id WHEN 1 THEN 3 ... END,
+                       popularity = popularity + CASE id WHEN 1 THEN 4.2 ... END
+    WHERE id IN (...)
+
+Being relative updates, flushes from any number of workers add up without
+coordination or lost counts.
+
+Popularity uses forward decay: a view at time t adds
+2 ** ((t - POPULARITY_EPOCH) / half-life), so newer views weigh
+exponentially more and comparing stored sums ranks projects exactly as
+decaying every score over time would, without ever rewriting old rows.
+The weights grow by 2**26 a year with a two-week half-life, well within a
+float for decades; move POPULARITY_EPOCH forward and rescale the column if
+that ever becomes a concern.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+
+from .models import Project
+
+_lock = threading.Lock()
+_views = {}  # project id -> views since the last flush
+_weights = {}  # project id -> popularity gained since the last flush
+_last_flush = time.monotonic()
+_timer = None
+
+
+def popularity_weight(timestamp=None):
+    """Forward-decay weight of a view happening at `timestamp` (epoch seconds)"""
+    if timestamp is None:
+        timestamp = time.time()
+    epoch = datetime.fromisoformat(settings.POPULARITY_EPOCH).replace(tzinfo=timezone.utc).timestamp()
+    half_life = settings.POPULARITY_HALF_LIFE_DAYS * 24 * 60 * 60
+    return 2.0 ** ((timestamp - epoch) / half_life)
+
+
+def record_view(project_id):
+    """Count one view of a project; written to the database on the next flush"""
+    global _timer
+    weight = popularity_weight()
+    with _lock:
+        _views[project_id] = _views.get(project_id, 0) + 1
+        _weights[project_id] = _weights.get(project_id, 0.0) + weight
+        due = (
+            sum(_views.values()) >= settings.VIEW_COUNT_FLUSH_SIZE
+            or time.monotonic() - _last_flush >= settings.VIEW_COUNT_FLUSH_SECONDS
+        )
+        if not due and _timer is None:
+            # Quiet periods still get flushed
+            _timer = threading.Timer(settings.VIEW_COUNT_FLUSH_SECONDS, _flush_in_background)
+            _timer.daemon = True
+            _timer.start()
+    if due:
+        _flush_logged()
+
+
+def flush_views():
+    """Write the buffered views in one UPDATE. Returns the number of projects updated."""
+    global _views, _weights, _last_flush, _timer
+    with _lock:
+        views, weights = _views, _weights
+        _views, _weights = {}, {}
+        _last_flush = time.monotonic()
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if not views:
+        return 0
+
+    try:
+        Project.objects.filter(id__in=list(views)).update(
+            views=F('views') + Case(
+                *[When(id=pk, then=Value(count)) for pk, count in views.items()],
+                output_field=IntegerField(),
+            ),
+            popularity=F('popularity') + Case(
+                *[When(id=pk, then=Value(weight)) for pk, weight in weights.items()],
+                output_field=FloatField(),
+            ),
+        )
+    except Exception:
+        # Keep the counts for the next attempt rather than dropping them
+        with _lock:
+            for pk, count in views.items():
+                _views[pk] = _views.get(pk, 0) + count
+                _weights[pk] = _weights.get(pk, 0.0) + weights[pk]
+        raise
+    return len(views)
+
+
+def _flush_logged():
+    # Counting views must never fail the request being served
+    try:
+        flush_views()
+    except Exception as e:
+        print(f"Flushing view counts failed: {e}")
+
+
+def _flush_in_background():
+    try:
+        _flush_logged()
+    finally:
+        # The timer thread's own connection would otherwise stay open
+        connection.close()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        flush_views()
+    except Exception:
+        pass
@@ -0,0 +1,167 @@
+"""
+Routing of public API reads to database replicas.
+
+Each alias in DATABASES besides `default` is a read replica (see
+DATABASE_REPLICA_URLS). ReplicaRoutingMiddleware lets a request read from
+one of them only when it is a safe-method request to a portfolio view from
+an anonymous client that hasn't written recently; everything else, and
+every write, goes to the primary:
+
+- Requests carrying credentials (JWT or admin session) read the primary,
+  so the admin always sees its own changes.
+- A request that writes reads the primary for the rest of the request.
+  Responses to unsafe methods also set a short lived cookie pinning the
+  client to the primary for DATABASE_REPLICA_PIN_SECONDS, longer than
+  replicas are expected to lag.
+- Data built for the shared API cache (portfolio.cache) is read from the
+  primary: an entry is keyed by the generation bumped when a write
+  commits, so building it from a lagging replica would cache old data
+  under the new generation.
+
+Replicas are health checked at most every
+DATABASE_REPLICA_HEALTH_CHECK_SECONDS per process: one that can't be
+reached, lacks the schema or (on PostgreSQL) lags more than
+DATABASE_REPLICA_MAX_LAG_SECONDS is left out until a later check passes.
+"""
+import contextvars
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, Error, connections
+
+PRIMARY = DEFAULT_DB_ALIAS
+PIN_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Seconds the replica is behind, or 0 when it has replayed everything it received
+POSTGRES_LAG_SQL = """
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+"""
+
+_routing = contextvars.ContextVar('db_routing', default=None)  # the current request's Routing
+_health = {}  # alias -> (checked at, healthy)
+
+
+class Routing:
+    """Database routing state of one request"""
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self):
+        self.replica = None  # alias reads go to, None for the primary
+        self.wrote = False
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+def check_replica(alias):
+    """Whether a replica can serve reads right now"""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            # A reachable but empty database (e.g. a SQLite path that doesn't
+            # exist, which connecting creates) has no migrations table
+            cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+            if connection.vendor == 'postgresql':
+                cursor.execute(POSTGRES_LAG_SQL)
+                lag, = cursor.fetchone()
+                if lag is not None and lag > settings.DATABASE_REPLICA_MAX_LAG_SECONDS:
+                    print(f"Database replica {alias} is {lag:.1f}s behind")
+                    return False
+    except Error as e:
+        print(f"Database replica {alias} failed its health check: {e}")
+        connection.close()
+        return False
+    return True
+
+
+def is_healthy(alias):
+    checked = _health.get(alias)
+    now = time.monotonic()
+    if checked is not None and now - checked[0] < settings.DATABASE_REPLICA_HEALTH_CHECK_SECONDS:
+        return checked[1]
+    healthy = check_replica(alias)
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    """A healthy replica alias at random, or None"""
+    healthy = [alias for alias in replica_aliases() if is_healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+def may_read_replica(request, view_func):
+    if request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES:
+        return False
+    if request.META.get('HTTP_AUTHORIZATION') or settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    # DRF views carry their class; only the portfolio API is routed
+    view_class = getattr(view_func, 'cls', None)
+    return view_class is not None and view_class.__module__.split('.')[0] == 'portfolio'
+
+
+def read_primary(func):
+    """Wrap `func` to run its queries on the primary"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _routing.set(Routing())
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _routing.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.wrote or routing.replica is None:
+            return PRIMARY
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            # Read your writes: no replica for the rest of the request
+            routing.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == PRIMARY
+
+
+class ReplicaRoutingMiddleware:
+    """Choose the database a request reads from, and pin recent writers to the primary"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = Routing()
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        # Not for writes done on the side of safe requests (e.g. flushing
+        # view counts): their responses may be cached and shared
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                secure=request.is_secure(), httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        if routing is not None and replica_aliases() and may_read_replica(request, view_func):
+            routing.replica = choose_replica()
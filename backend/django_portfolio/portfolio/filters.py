@@ -0,0 +1,126 @@
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .mixins import parse_field_list
+from .models import Message, ProjectTag, Tag
+from .tag_index import MATCH_ALL, MATCH_ANY, tag_index, tag_key
+
+
+class ProjectOrderingFilter(filters.OrderingFilter):
+    """
+    Ordering filter that sorts `date` by the parsed `date_sort` column
+    instead of the free-text string. Undated projects always come last.
+    """
+    field_aliases = {'date': 'date_sort'}
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        result = []
+        for field in ordering:
+            descending = field.startswith('-')
+            name = self.field_aliases.get(field.lstrip('-'), field.lstrip('-'))
+            result.append(f"-{name}" if descending else name)
+        return result
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        expressions = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if field.startswith('-'):
+                expressions.append(F(name).desc(nulls_last=True))
+            else:
+                expressions.append(F(name).asc(nulls_last=True))
+        return queryset.order_by(*expressions)
+
+
+class TagFilterBackend(filters.BaseFilterBackend):
+    """
+    `?tags=branding,print` keeps projects having all of the tags, or any of
+    them with `&tags_mode=any`. Tag names are compared by tag_key(), so
+    matching is case-insensitive and the same on every database.
+
+    Matches come from the in-process bitmap index and are applied as one
+    `id IN (...)` filter. Large result sets, or a disabled index, go
+    through the equivalent SQL subquery instead.
+    """
+    tags_param = 'tags'
+    mode_param = 'tags_mode'
+
+    def filter_queryset(self, request, queryset, view):
+        names = parse_field_list(request.query_params.get(self.tags_param))
+        if not names:
+            return queryset
+        names = {tag_key(name) for name in names}
+        mode = MATCH_ANY if request.query_params.get(self.mode_param) == MATCH_ANY else MATCH_ALL
+
+        if settings.TAG_INDEX_ENABLED:
+            ids = tag_index.match(names, mode, limit=settings.TAG_INDEX_MAX_IDS)
+            if ids is not None:
+                return queryset.filter(id__in=ids)
+        return self.filter_sql(queryset, names, mode)
+
+    def filter_sql(self, queryset, names, mode):
+        """Filter on the tag_key() values `names` through a subquery"""
+        # Names are resolved to tag ids here rather than with __iexact,
+        # whose case folding differs between databases and from the index
+        groups = {}
+        for tag_id, name in Tag.objects.values_list('id', 'name'):
+            key = tag_key(name)
+            if key in names:
+                groups.setdefault(key, []).append(tag_id)
+        if not groups or mode == MATCH_ALL and len(groups) < len(names):
+            return queryset.none()
+        project_tags = ProjectTag.objects.filter(tag_id__in=[pk for ids in groups.values() for pk in ids])
+        if mode == MATCH_ALL:
+            # One grouped subquery instead of a join per tag; tags sharing a
+            # key count as the same name
+            name_of_tag = Case(*(When(tag_id__in=ids, then=Value(i)) for i, ids in enumerate(groups.values())))
+            project_tags = (
+                project_tags.values('project_id')
+                .annotate(matched=Count(name_of_tag, distinct=True))
+                .filter(matched=len(names))
+            )
+        return queryset.filter(id__in=project_tags.values('project_id'))
+
+
+# Indexed by migration 0006 on Postgres; keep both in sync
+MESSAGE_SEARCH_DOCUMENT = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(email, '') || ' ' || "
+    "coalesce(subject, '') || ' ' || coalesce(message, ''))"
+)
+
+
+class MessageSearchFilter(filters.BaseFilterBackend):
+    """
+    `?search=` over message name, email, subject and body. Postgres uses
+    the GIN full text index (web search syntax: "quoted phrases", -word,
+    or); other databases fall back to a case-insensitive substring match.
+    """
+    search_param = 'search'
+    search_fields = ['name', 'email', 'subject', 'message']
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if connections[queryset.db].vendor == 'postgresql':
+            matches = RawSQL(
+                f"SELECT id FROM {Message._meta.db_table} "
+                f"WHERE {MESSAGE_SEARCH_DOCUMENT} @@ websearch_to_tsquery('simple', %s)",
+                [query],
+            )
+            return queryset.filter(id__in=matches)
+        return queryset.filter(
+            reduce(or_, (Q(**{f"{field}__icontains": query}) for field in self.search_fields))
+        )
@@ -0,0 +1,112 @@
+"""
+HTTP caching of public API responses by CDNs and other shared caches.
+
+Anonymous GETs of public endpoints are sent with
+
+    Cache-Control: public, max-age=60, s-maxage=600, stale-while-revalidate=86400, ...
+    Surrogate-Key: projects tags project-12 project-15 ...
+
+(also as Cache-Tag, for caches using that name), while responses to
+authenticated requests are marked private. Surrogate keys name the cache
+generation groups a response was built from (portfolio.cache) and the
+objects in it, so when content changes the shared cache can be told to
+drop exactly the responses that contain it: a change to a model purges
+its generation groups, like the API data cache, plus the changed object's
+own key. Keys to purge are sent through the `surrogate_purge` signal once
+the change commits, and POSTed to CACHE_PURGE_URL when that is set.
+"""
+import json
+import urllib.request
+
+from django.conf import settings
+from django.dispatch import Signal
+
+from .cache import MODEL_GENERATIONS
+
+# Sent with `keys`, the surrogate keys whose cached responses are outdated
+surrogate_purge = Signal()
+
+# Header value limits of common CDNs are around 16 KB
+MAX_KEYS_LENGTH = 8 * 1024
+
+
+def public_cache_control():
+    return (
+        f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, "
+        f"s-maxage={settings.HTTP_CACHE_SHARED_MAX_AGE}, "
+        f"stale-while-revalidate={settings.HTTP_CACHE_STALE_SECONDS}, "
+        f"stale-if-error={settings.HTTP_CACHE_STALE_SECONDS}"
+    )
+
+
+def object_key(model_name, pk):
+    return f"{model_name}-{pk}"
+
+
+def instance_keys(instance):
+    """Surrogate keys of the responses that show `instance`"""
+    model_name = instance._meta.model_name
+    keys = set(MODEL_GENERATIONS.get(model_name, ()))
+    project_id = getattr(instance, 'project_id', None)
+    if project_id is not None:
+        # Images and tag assignments are shown as part of their project
+        keys.add(object_key('project', project_id))
+    else:
+        keys.add(object_key(model_name, instance.pk))
+    return keys
+
+
+def response_object_ids(data):
+    """IDs of the objects in a detail, list or paginated response body"""
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        data = data['results']
+    items = data if isinstance(data, list) else [data]
+    return [item['id'] for item in items if isinstance(item, dict) and 'id' in item]
+
+
+def header_value(groups, objects, separator):
+    value = separator.join(list(groups) + list(objects))
+    if len(value) > MAX_KEYS_LENGTH:
+        # Drop the object keys rather than send a header the cache rejects;
+        # the group keys alone still purge the response
+        value = separator.join(groups)
+    return value
+
+
+def set_cache_headers(request, response, groups, objects):
+    """Mark a response public with surrogate keys, or private when authenticated"""
+    if response.has_header('Cache-Control'):
+        return response
+    if request.META.get('HTTP_AUTHORIZATION') or request.user.is_authenticated:
+        # Never let a shared cache hand one user's response to another
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+    response['Cache-Control'] = public_cache_control()
+    groups = sorted(set(groups))
+    objects = list(dict.fromkeys(objects))
+    response['Surrogate-Key'] = header_value(groups, objects, ' ')
+    response['Cache-Tag'] = header_value(groups, objects, ',')
+    return response
+
+
+def purge_surrogate_keys(keys):
+    """Tell shared caches to drop the responses tagged with any of `keys`"""
+    keys = sorted(keys)
+    surrogate_purge.send(sender=None, keys=keys)
+    if not settings.CACHE_PURGE_URL:
+        return
+    request = urllib.request.Request(
+        settings.CACHE_PURGE_URL,
+        data=json.dumps({'keys': keys}).encode('utf-8'),
+        headers={
+            'Content-Type': 'application/json',
+            'Authorization': f"Bearer {settings.CACHE_PURGE_TOKEN}",
+        },
+        method='POST',
+    )
+    # Purging must never fail the write that triggered it; the s-maxage
+    # bounds how long the shared cache can serve the old content anyway
+    try:
+        urllib.request.urlopen(request, timeout=settings.CACHE_PURGE_TIMEOUT).close()
+    except Exception as e:
+        print(f"Purging surrogate keys failed: {e}")
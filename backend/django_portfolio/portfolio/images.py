@@ -0,0 +1,437 @@
+"""
+Image validation and derivative generation.
+
+Derivatives are resized WebP copies stored next to the original under a
+fixed naming convention, so any code holding an image name can find them
+without a lookup:
+
+    projects/BOOK_COVER-11.png -> projects/derivatives/BOOK_COVER-11-480w.webp
+
+Only widths smaller than the original are generated. The functions here
+work on bytes and plain arguments and don't touch the database, so they
+can run in worker processes.
+
+Besides derivatives, every image gets metadata letting clients lay out and
+preview it before downloading it: its size, its dominant color and a tiny
+blurred-up placeholder as a base64 data URI (a few hundred bytes).
+
+Uploads are checked from their header alone (format, pixel count, frame
+count) before anything decodes them, so an image that would take gigabytes
+once decoded is rejected at the cost of reading a few bytes. Accepted
+images have their metadata removed: EXIF (camera, GPS position), XMP, text
+chunks and comments, and ICC profiles that only restate sRGB, which
+browsers assume anyway. This is done on the file's chunks and segments,
+without decoding or recompressing the pixels; only an image that needs an
+EXIF rotation applied is re-encoded, once.
+"""
+import base64
+import io
+import os
+import posixpath
+import re
+import struct
+import zipfile
+import zlib
+
+from PIL import Image, ImageOps, JpegImagePlugin, UnidentifiedImageError
+
+try:
+    from PIL import ImageCms
+except ImportError:  # Pillow built without littlecms
+    ImageCms = None
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+DERIVATIVE_FORMAT = 'WEBP'
+DERIVATIVES_DIR = 'derivatives'
+DERIVATIVE_RE = re.compile(r'^(?P<stem>.+)-\d+w\.webp$')
+DERIVATIVE_QUALITY = 80
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_QUALITY = 40
+# Dominant color is picked from a thumbnail this big, quantized to a palette
+COLOR_SAMPLE_SIZE = 64
+COLOR_PALETTE_SIZE = 5
+# Source pixels per band when reducing images with alpha (4 bytes each)
+REDUCE_BAND_PIXELS = 1_000_000
+# Quality of WebPs re-encoded to apply their EXIF orientation
+REENCODE_WEBP_QUALITY = 90
+EXIF_ORIENTATION = 0x0112
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_METADATA_CHUNKS = {b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME'}
+# APP1 (EXIF, XMP), APP13 (IPTC/Photoshop) and comments
+JPEG_METADATA_MARKERS = {0xE1, 0xED, 0xFE}
+JPEG_ICC_MARKER = 0xE2
+JPEG_ICC_PREFIX = b'ICC_PROFILE\x00'
+# Markers that aren't followed by a segment length
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+WEBP_METADATA_CHUNKS = {b'EXIF': 0x08, b'XMP ': 0x04}  # chunk: VP8X flag
+WEBP_ICC_FLAG = 0x20
+
+
+class ImageValidationError(ValueError):
+    pass
+
+
+def derivative_name(name, width):
+    """Storage name of the `width` pixels wide derivative of image `name`"""
+    directory, filename = posixpath.split(name)
+    stem = os.path.splitext(filename)[0]
+    return posixpath.join(directory, DERIVATIVES_DIR, f"{stem}-{width}w.webp")
+
+
+def derivative_stem(filename):
+    """Stem of the original a derivative file name belongs to, or None"""
+    match = DERIVATIVE_RE.match(filename)
+    return match.group('stem') if match else None
+
+
+def read_source(source, member):
+    """Bytes of `member` from a ZIP archive or directory at `source`"""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            return archive.read(member)
+    path = os.path.normpath(os.path.join(source, member))
+    # Manifest entries must stay inside the image directory
+    if os.path.commonpath([os.path.abspath(source), os.path.abspath(path)]) != os.path.abspath(source):
+        raise ImageValidationError(f"{member}: outside the image directory")
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def open_validated(data, label):
+    """Decode `data` fully and return the image, or raise ImageValidationError"""
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            if probe.format not in ALLOWED_FORMATS:
+                raise ImageValidationError(f"{label}: unsupported format {probe.format}")
+            probe.verify()
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except UnidentifiedImageError:
+        raise ImageValidationError(f"{label}: not a recognised image")
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ImageValidationError(f"{label}: not a valid image ({e})")
+    return image
+
+
+def inspect(file, label, max_pixels):
+    """
+    (format, EXIF orientation) of an image, read from its header only.
+
+    Raises ImageValidationError for unsupported formats and for images with
+    more than `max_pixels` pixels, counting every frame of animations.
+    """
+    try:
+        with Image.open(file) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ImageValidationError(f"{label}: unsupported format {image.format}")
+            width, height = image.size
+            pixels = width * height * getattr(image, 'n_frames', 1)
+            if max_pixels and pixels > max_pixels:
+                raise ImageValidationError(
+                    f"{label}: {width}x{height} image is too large "
+                    f"({pixels:,} pixels, at most {max_pixels:,} allowed)"
+                )
+            # From the EXIF seen while reading the header; getexif() would
+            # decode a whole PNG looking for an eXIf chunk after the pixels
+            orientation = 1
+            if image.info.get('exif'):
+                exif = Image.Exif()
+                exif.load(image.info['exif'])
+                orientation = exif.get(EXIF_ORIENTATION, 1)
+            return image.format, orientation
+    except UnidentifiedImageError:
+        raise ImageValidationError(f"{label}: not a recognised image")
+    except Image.DecompressionBombError:
+        raise ImageValidationError(f"{label}: image is too large")
+    except (OSError, SyntaxError, struct.error) as e:
+        raise ImageValidationError(f"{label}: not a valid image ({e})")
+
+
+def is_srgb_profile(profile):
+    """Whether ICC profile bytes describe sRGB; False when it can't be told"""
+    if ImageCms is None or not profile:
+        return False
+    try:
+        description = ImageCms.getProfileDescription(ImageCms.ImageCmsProfile(io.BytesIO(profile)))
+    except (ImageCms.PyCMSError, OSError, ValueError):
+        return False
+    return description.strip().lower().startswith('srgb')
+
+
+def strip_png(data, label):
+    chunks = [PNG_SIGNATURE]
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        if position + 8 > len(data):
+            raise ImageValidationError(f"{label}: truncated PNG")
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        end = position + 12 + length
+        if end > len(data):
+            raise ImageValidationError(f"{label}: truncated PNG")
+        drop = kind in PNG_METADATA_CHUNKS
+        if kind == b'iCCP':
+            # Profile name, NUL, compression method, zlib stream
+            body = data[position + 8:end - 4]
+            try:
+                drop = is_srgb_profile(zlib.decompress(body[body.index(b'\x00') + 2:]))
+            except (ValueError, zlib.error):
+                drop = False
+        if not drop:
+            chunks.append(data[position:end])
+        position = end
+        if kind == b'IEND':
+            break
+    return b''.join(chunks)
+
+
+def strip_jpeg(data, label):
+    segments = [data[:2]]
+    icc = []
+    position = 2
+    while True:
+        if position + 2 > len(data) or data[position] != 0xFF:
+            raise ImageValidationError(f"{label}: truncated JPEG")
+        # Markers may be padded with any number of 0xFF fill bytes
+        while position + 2 < len(data) and data[position + 1] == 0xFF:
+            position += 1
+        marker = data[position + 1]
+        if marker in JPEG_STANDALONE_MARKERS:
+            segments.append(data[position:position + 2])
+            position += 2
+            continue
+        if marker == 0xDA or marker == 0xD9:
+            # Start of scan: the rest is entropy-coded data, kept as is
+            segments.append(data[position:])
+            break
+        if position + 4 > len(data):
+            raise ImageValidationError(f"{label}: truncated JPEG")
+        length, = struct.unpack('>H', data[position + 2:position + 4])
+        end = position + 2 + length
+        if length < 2 or end > len(data):
+            raise ImageValidationError(f"{label}: truncated JPEG")
+        segment = data[position:end]
+        if marker == JPEG_ICC_MARKER and segment[4:4 + len(JPEG_ICC_PREFIX)] == JPEG_ICC_PREFIX:
+            # Profiles are split over several APP2 segments; decide once all are seen
+            icc.append(len(segments))
+        if marker not in JPEG_METADATA_MARKERS:
+            segments.append(segment)
+        position = end
+    if icc:
+        # Each segment: marker, length, prefix, sequence number, count, data
+        start = 4 + len(JPEG_ICC_PREFIX)
+        parts = sorted((segments[i][start], segments[i][start + 2:]) for i in icc)
+        if is_srgb_profile(b''.join(part for _, part in parts)):
+            icc = set(icc)
+            segments = [segment for i, segment in enumerate(segments) if i not in icc]
+    return b''.join(segments)
+
+
+def strip_webp(data, label):
+    if data[:4] != b'RIFF' or data[8:12] != b'WEBP':
+        raise ImageValidationError(f"{label}: not a valid WebP")
+    chunks = []
+    position = 12
+    while position + 8 <= len(data):
+        kind, length = struct.unpack('<4sI', data[position:position + 8])
+        end = position + 8 + length + (length & 1)
+        if end > len(data):
+            raise ImageValidationError(f"{label}: truncated WebP")
+        chunks.append([kind, data[position:end]])
+        position = end
+    # Only extended (VP8X) files carry metadata, flagged in its header
+    if not chunks or chunks[0][0] != b'VP8X':
+        return data
+    flags = chunks[0][1][8]
+    kept = []
+    for kind, chunk in chunks:
+        if kind in WEBP_METADATA_CHUNKS:
+            flags &= ~WEBP_METADATA_CHUNKS[kind]
+        elif kind == b'ICCP' and is_srgb_profile(chunk[8:8 + struct.unpack('<I', chunk[4:8])[0]]):
+            flags &= ~WEBP_ICC_FLAG
+        else:
+            kept.append(chunk)
+    header = kept[0]
+    kept[0] = header[:8] + bytes([flags]) + header[9:]
+    body = b'WEBP' + b''.join(kept)
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def reencode_oriented(data, image_format):
+    """Apply the EXIF orientation in a single re-encode, leaving metadata out"""
+    with Image.open(io.BytesIO(data)) as source:
+        profile = source.info.get('icc_profile')
+        options = {'icc_profile': None if is_srgb_profile(profile) else profile}
+        if image_format == 'JPEG':
+            # Reuse the source's quantization tables and chroma subsampling,
+            # so the pixels lose no more quality than the re-encode itself costs
+            options.update(
+                qtables=source.quantization, subsampling=JpegImagePlugin.get_sampling(source), comment=b'',
+            )
+        elif image_format == 'WEBP':
+            options.update(quality=REENCODE_WEBP_QUALITY)
+        image = ImageOps.exif_transpose(source)
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def strip_metadata(data, image_format, orientation, label):
+    """`data` without EXIF/XMP/text metadata and redundant sRGB profiles"""
+    if orientation not in (None, 1):
+        return reencode_oriented(data, image_format)
+    if image_format == 'PNG':
+        return strip_png(data, label)
+    if image_format == 'JPEG':
+        return strip_jpeg(data, label)
+    if image_format == 'WEBP':
+        return strip_webp(data, label)
+    return data
+
+
+def clean_image(file, label, max_pixels, max_bytes):
+    """
+    Bytes of an uploaded image with its metadata stripped, checked against
+    the size caps before any decoding. Raises ImageValidationError.
+    """
+    size = getattr(file, 'size', None)
+    if max_bytes and size is not None and size > max_bytes:
+        raise ImageValidationError(f"{label}: file is too large ({size:,} bytes, at most {max_bytes:,} allowed)")
+    file.seek(0)
+    image_format, orientation = inspect(file, label, max_pixels)
+    file.seek(0)
+    data = file.read()
+    if max_bytes and len(data) > max_bytes:
+        raise ImageValidationError(f"{label}: file is too large ({len(data):,} bytes, at most {max_bytes:,} allowed)")
+    try:
+        return strip_metadata(data, image_format, orientation, label)
+    except (OSError, SyntaxError, struct.error, IndexError) as e:
+        raise ImageValidationError(f"{label}: not a valid image ({e})")
+
+
+def make_derivatives(image, widths):
+    """{width: WebP bytes} for each of `widths` below the image width"""
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    derivatives = {}
+    for width in sorted(widths):
+        if width >= image.width:
+            continue
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, DERIVATIVE_FORMAT, quality=DERIVATIVE_QUALITY, method=4)
+        derivatives[width] = buffer.getvalue()
+    return derivatives
+
+
+def flattened(image):
+    """RGB copy of an image, with any transparency composited onto white"""
+    if image.mode in ('RGBA', 'LA', 'P', 'PA'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def dominant_color(image):
+    """Hex color of the largest cluster of a median cut palette of `image`"""
+    sample = flattened(image)
+    sample.thumbnail((COLOR_SAMPLE_SIZE, COLOR_SAMPLE_SIZE), Image.BILINEAR, reducing_gap=2.0)
+    palette_image = sample.quantize(colors=COLOR_PALETTE_SIZE, method=Image.Quantize.MEDIANCUT)
+    count, index = max(palette_image.getcolors())
+    red, green, blue = palette_image.getpalette()[index * 3:index * 3 + 3]
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def placeholder(image):
+    """Tiny WebP of `image` as a data URI, meant to be shown blurred and stretched"""
+    height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    tiny = flattened(image).resize((PLACEHOLDER_WIDTH, height), Image.BILINEAR, reducing_gap=2.0)
+    buffer = io.BytesIO()
+    tiny.save(buffer, 'WEBP', quality=PLACEHOLDER_QUALITY)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def reduced(image, factor):
+    """
+    image.reduce(factor), a band of rows at a time. Pillow reduces images
+    with alpha through a premultiplied copy, which for the whole image would
+    double the memory of a decoded upload.
+    """
+    if image.mode not in ('RGBA', 'LA'):
+        return image.reduce(factor)
+    band = factor * max(1, REDUCE_BAND_PIXELS // (image.width * factor))
+    result = Image.new(image.mode, (-(-image.width // factor), -(-image.height // factor)))
+    for top in range(0, image.height, band):
+        piece = image.crop((0, top, image.width, min(top + band, image.height)))
+        result.paste(piece.reduce(factor), (0, top // factor))
+    return result
+
+
+def image_metadata(image):
+    """Size, dominant color and placeholder of a decoded image"""
+    if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGBA' if image.mode in ('P', 'PA') or 'A' in image.getbands() else 'RGB')
+    # The color and placeholder only need a small copy; reduce() is much
+    # cheaper than resampling the full image for each of them
+    factor = max(1, min(image.width, image.height) // (COLOR_SAMPLE_SIZE * 2))
+    small = reduced(image, factor) if factor > 1 else image
+    return {
+        'width': image.width,
+        'height': image.height,
+        'dominant_color': dominant_color(small),
+        'placeholder': placeholder(small),
+    }
+
+
+def read_metadata(file, label):
+    """image_metadata() of an image file or file-like object"""
+    try:
+        with Image.open(file) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ImageValidationError(f"{label}: unsupported format {image.format}")
+            width, height = image.size
+            # JPEGs can be decoded at a fraction of their size right away
+            image.draft('RGB', (COLOR_SAMPLE_SIZE * 2, COLOR_SAMPLE_SIZE * 2))
+            metadata = image_metadata(image)
+    except UnidentifiedImageError:
+        raise ImageValidationError(f"{label}: not a recognised image")
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ImageValidationError(f"{label}: not a valid image ({e})")
+    return dict(metadata, width=width, height=height)
+
+
+def metadata_task(task):
+    """Worker entry point: (pk, path) -> (pk, metadata or error message)"""
+    pk, path = task
+    try:
+        return pk, read_metadata(path, path)
+    except ImageValidationError as e:
+        return pk, str(e)
+
+
+def process_image(task):
+    """
+    Worker entry point: read, validate and resize one image.
+
+    `task` is (source, member, name, widths, max_pixels). Returns a dict
+    with the original bytes (metadata stripped), the derivative bytes and
+    the image metadata, or with an `error` message.
+    """
+    source, member, name, widths, max_pixels = task
+    try:
+        data = read_source(source, member)
+        image_format, orientation = inspect(io.BytesIO(data), member, max_pixels)
+        data = strip_metadata(data, image_format, orientation, member)
+        image = open_validated(data, member)
+        return {
+            'member': member,
+            'name': name,
+            'data': data,
+            'metadata': image_metadata(image),
+            'derivatives': make_derivatives(image, widths),
+        }
+    except (ImageValidationError, KeyError, OSError) as e:
+        return {'member': member, 'name': name, 'error': str(e)}
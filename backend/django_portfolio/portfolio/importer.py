@@ -0,0 +1,275 @@
+"""
+Bulk project import from an NDJSON manifest plus a ZIP or directory of
+images.
+
+Each manifest line describes one project:
+
+    {"title": "...", "slug": "...", "category": "Print", "description": "...",
+     "client": "...", "date": "Jan 2023", "featured": false,
+     "tags": ["poster", "print"],
+     "images": [{"file": "posters/a.png", "alt_text": "...", "is_main": true}]}
+
+Projects whose slug already exists are skipped, so an interrupted import
+can simply be run again. Images of a batch are decoded, validated and
+resized in a process pool; the batch's projects, tags and images are then
+inserted with bulk_create in one transaction. A project with an invalid
+image is reported and skipped as a whole.
+"""
+import json
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.validators import validate_slug
+from django.db import transaction
+from django.utils.text import slugify
+
+from .cache import PROJECTS, TAGS, bump_generations
+from .http_cache import purge_surrogate_keys
+from .images import derivative_name, process_image
+from .models import Project, ProjectImage, ProjectTag, Tag
+from .tag_index import TAG_INDEX
+from .utils import parse_display_date
+
+REQUIRED_FIELDS = ('title', 'category', 'description', 'date')
+SLUG_MAX_LENGTH = Project._meta.get_field('slug').max_length
+TAG_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = []
+        self.skipped = []
+        self.errors = []
+
+    def as_dict(self):
+        return {
+            'created': len(self.created),
+            'skipped': len(self.skipped),
+            'errors': self.errors,
+        }
+
+
+def read_manifest(lines):
+    """(line number, entry) pairs of a manifest; raises ValueError on bad lines"""
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: invalid JSON ({e})")
+        if not isinstance(entry, dict):
+            raise ValueError(f"line {number}: expected an object")
+        yield number, entry
+
+
+def image_name(slug, index, member):
+    """Preferred storage name of an image; save_image() picks another if it is taken"""
+    extension = os.path.splitext(member)[1].lower()
+    return posixpath.join('projects', f"{slug}-{index}{extension}")
+
+
+def available_name(name, widths):
+    """`name` or a variant of it that is free, along with its derivative names"""
+    root, extension = os.path.splitext(name)
+    candidate = name
+    while default_storage.exists(candidate) or any(
+        default_storage.exists(derivative_name(candidate, width)) for width in widths
+    ):
+        candidate = default_storage.get_alternative_name(root, extension)
+    return candidate
+
+
+def save_image(name, data, derivatives):
+    """
+    Store an image and its {width: bytes} derivatives, never replacing an
+    existing file (it may belong to another project). Returns the name used.
+    """
+    name = default_storage.save(available_name(name, derivatives.keys()), ContentFile(data))
+    for width, derivative in derivatives.items():
+        default_storage.save(derivative_name(name, width), ContentFile(derivative))
+    return name
+
+
+def resolve_tags(names):
+    """{name: Tag} for `names`, creating the missing ones in one statement"""
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = [Tag(name=name) for name in names if name not in tags]
+    if missing:
+        Tag.objects.bulk_create(missing, ignore_conflicts=True)
+        tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    return tags
+
+
+def import_batch(entries, processed, result):
+    """Store the files and insert the rows of one batch of valid entries"""
+    for images in processed.values():
+        for image in images:
+            image['name'] = save_image(image['name'], image['data'], image['derivatives'])
+
+    tag_names = {name for entry in entries for name in entry['tags']}
+    with transaction.atomic():
+        tags = resolve_tags(tag_names)
+        projects = []
+        for entry in entries:
+            images = processed[entry['slug']]
+            date_sort, date_precision = parse_display_date(entry['date'])
+            main = next((image for image, spec in zip(images, entry['images']) if spec.get('is_main')),
+                        images[0] if images else None)
+            # bulk_create skips save() and signals, so derived columns are set here
+            projects.append(Project(
+                title=entry['title'],
+                slug=entry['slug'],
+                category=entry['category'],
+                description=entry['description'],
+                client=entry.get('client'),
+                date=entry['date'],
+                date_sort=date_sort,
+                date_precision=date_precision,
+                featured=bool(entry.get('featured', False)),
+                main_image=main['name'] if main else '',
+                tag_names=list(entry['tags']),
+            ))
+        Project.objects.bulk_create(projects)
+
+        project_images = []
+        project_tags = []
+        for project, entry in zip(projects, entries):
+            images = processed[entry['slug']]
+            has_main = any(spec.get('is_main') for spec in entry['images'])
+            for order, (image, spec) in enumerate(zip(images, entry['images'])):
+                project_images.append(ProjectImage(
+                    project=project,
+                    image=image['name'],
+                    is_main=bool(spec.get('is_main')) if has_main else order == 0,
+                    alt_text=spec.get('alt_text', ''),
+                    order=spec.get('order', order),
+                    **image['metadata'],
+                ))
+            project_tags.extend(ProjectTag(project=project, tag=tags[name]) for name in entry['tags'])
+        ProjectImage.objects.bulk_create(project_images)
+        ProjectTag.objects.bulk_create(project_tags)
+
+    result.created.extend(project.pk for project in projects)
+
+
+def normalize(number, entry, seen, result):
+    """Validated copy of a manifest entry, or None if it is skipped"""
+    missing = [field for field in REQUIRED_FIELDS if not entry.get(field)]
+    if missing:
+        result.errors.append(f"line {number}: missing {', '.join(missing)}")
+        return None
+    slug = slugify(str(entry.get('slug') or entry['title']))
+    try:
+        validate_slug(slug)
+    except ValidationError:
+        result.errors.append(f"line {number}: no valid slug in {entry.get('slug') or entry['title']!r}")
+        return None
+    if len(slug) > SLUG_MAX_LENGTH:
+        result.errors.append(f"line {number}: slug {slug} is longer than {SLUG_MAX_LENGTH} characters")
+        return None
+    if slug in seen:
+        result.errors.append(f"line {number}: duplicate slug {slug}")
+        return None
+    seen.add(slug)
+
+    images = entry.get('images') or []
+    images = [{'file': spec} if isinstance(spec, str) else spec for spec in images]
+    if not all(isinstance(spec, dict) and spec.get('file') for spec in images):
+        result.errors.append(f"line {number}: every image needs a file")
+        return None
+    if not isinstance(entry.get('tags') or [], list):
+        result.errors.append(f"line {number}: tags must be a list")
+        return None
+    tags = [str(name).strip() for name in entry.get('tags') or [] if name and str(name).strip()]
+    too_long = [name for name in tags if len(name) > TAG_MAX_LENGTH]
+    if too_long:
+        result.errors.append(f"line {number}: tag {too_long[0]!r} is longer than {TAG_MAX_LENGTH} characters")
+        return None
+    return dict(entry, slug=slug, images=images, tags=list(dict.fromkeys(tags)))
+
+
+def import_projects(manifest_lines, image_source, workers=None, batch_size=None, progress=None):
+    """
+    Import the projects of an NDJSON manifest, reading images from the ZIP
+    file or directory `image_source`. `progress(message)` is called after
+    every batch. Returns an ImportResult.
+    """
+    workers = settings.IMPORT_WORKERS if workers is None else workers
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    widths = settings.IMAGE_DERIVATIVE_WIDTHS
+    max_pixels = settings.IMAGE_MAX_PIXELS
+    result = ImportResult()
+    seen = set()
+
+    entries = []
+    for number, entry in read_manifest(manifest_lines):
+        entry = normalize(number, entry, seen, result)
+        if entry is not None:
+            entries.append((number, entry))
+
+    existing = set(Project.objects.filter(slug__in=seen).values_list('slug', flat=True))
+    result.skipped = [entry['slug'] for _, entry in entries if entry['slug'] in existing]
+    entries = [(number, entry) for number, entry in entries if entry['slug'] not in existing]
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            tasks = [
+                (image_source, spec['file'], image_name(entry['slug'], index, spec['file']), widths, max_pixels)
+                for _, entry in batch
+                for index, spec in enumerate(entry['images'])
+            ]
+            if executor is not None:
+                outcomes = list(executor.map(process_image, tasks, chunksize=4))
+            else:
+                outcomes = [process_image(task) for task in tasks]
+
+            # Group the processed images back by project, dropping projects
+            # with any failed image
+            outcomes = iter(outcomes)
+            processed = {}
+            valid = []
+            for number, entry in batch:
+                images = [next(outcomes) for _ in entry['images']]
+                failed = [image['error'] for image in images if 'error' in image]
+                if failed:
+                    result.errors.append(f"line {number}: {'; '.join(failed)}")
+                    continue
+                processed[entry['slug']] = images
+                valid.append(entry)
+
+            if valid:
+                import_batch(valid, processed, result)
+            if progress:
+                progress(f"{min(start + batch_size, len(entries))}/{len(entries)} processed, "
+                         f"{len(result.created)} created, {len(result.errors)} error(s)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if result.created:
+        after_import(result.created)
+    return result
+
+
+def after_import(project_ids):
+    """Refresh what bulk_create's missing signals would have refreshed"""
+    bump_generations([PROJECTS, TAGS, TAG_INDEX])
+    purge_surrogate_keys([PROJECTS, TAGS])
+    # A full pass costs about the same as an incremental one over this many
+    # changed projects
+    from .related import compute_all
+    compute_all()
+    if settings.SNAPSHOT_AUTO_EXPORT:
+        from .snapshot import export_snapshot
+        export_snapshot()
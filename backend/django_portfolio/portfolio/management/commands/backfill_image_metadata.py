@@ -0,0 +1,57 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from portfolio.cache import PROJECTS, bump_generations
+from portfolio.http_cache import object_key, purge_surrogate_keys
+from portfolio.images import metadata_task
+from portfolio.models import ProjectImage
+
+
+class Command(BaseCommand):
+    help = "Read the size, dominant color and placeholder of project images that don't have them yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Redo images that already have metadata")
+        parser.add_argument('--workers', type=int, help="Image processes (default: IMPORT_WORKERS)")
+        parser.add_argument('--batch-size', type=int, default=200, help="Images per UPDATE")
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or settings.IMPORT_WORKERS
+        images = ProjectImage.objects.order_by('id')
+        if not options['all']:
+            images = images.filter(width__isnull=True)
+        rows = list(images.values_list('id', 'image', 'project_id'))
+        tasks = [(pk, default_storage.path(name)) for pk, name, _ in rows]
+        projects = {pk: project_id for pk, _, project_id in rows}
+        self.stdout.write(f"{len(tasks)} image(s) to read with {workers} worker(s)")
+
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        updated = []
+        failed = 0
+        try:
+            results = executor.map(metadata_task, tasks, chunksize=4) if executor else map(metadata_task, tasks)
+            batch = []
+            for done, (pk, metadata) in enumerate(results, 1):
+                if isinstance(metadata, str):
+                    self.stderr.write(metadata)
+                    failed += 1
+                else:
+                    batch.append(ProjectImage(pk=pk, **metadata))
+                if len(batch) >= options['batch_size'] or done == len(tasks):
+                    ProjectImage.objects.bulk_update(batch, ProjectImage.METADATA_FIELDS)
+                    updated.extend(image.pk for image in batch)
+                    batch = []
+                    self.stdout.write(f"{done}/{len(tasks)} read")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if updated:
+            # bulk_update skips the signals that would invalidate cached responses
+            bump_generations([PROJECTS])
+            project_ids = {projects[pk] for pk in updated}
+            purge_surrogate_keys([PROJECTS] + [object_key('project', pk) for pk in project_ids])
+        self.stdout.write(self.style.SUCCESS(f"Updated {len(updated)} image(s), {failed} failed"))
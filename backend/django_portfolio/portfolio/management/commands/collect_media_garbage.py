@@ -0,0 +1,99 @@
+import os
+import posixpath
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from portfolio.images import DERIVATIVES_DIR, derivative_stem
+from portfolio.media_cleanup import delete_file, referenced_names
+from portfolio.models import ProjectImage, Skill
+
+
+def walk(root, directory):
+    """(storage name, DirEntry) of every file below `directory`, streamed with scandir"""
+    try:
+        entries = os.scandir(os.path.join(root, directory))
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            name = posixpath.join(directory, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(root, name)
+            elif entry.is_file(follow_symlinks=False):
+                yield name, entry
+
+
+class Command(BaseCommand):
+    help = "Delete media files that no project image or skill refers to, and derivatives of such files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list the files that would be deleted")
+        parser.add_argument('--batch-size', type=int, default=500, help="Files per reference check and deletion")
+        parser.add_argument(
+            '--min-age', type=int, default=settings.MEDIA_GARBAGE_MIN_AGE_SECONDS,
+            help="Leave files modified less than this many seconds ago alone",
+        )
+
+    def handle(self, *args, **options):
+        directories = sorted({
+            field.upload_to.strip('/')
+            for field in (ProjectImage._meta.get_field('image'), Skill._meta.get_field('icon'))
+            if isinstance(field.upload_to, str)
+        })
+        referenced = referenced_names()
+        # Derivatives are kept as long as their original is
+        stems = set()
+        for name in referenced:
+            directory, filename = posixpath.split(name)
+            stems.add((directory, os.path.splitext(filename)[0]))
+        cutoff = time.time() - options['min_age']
+        self.stdout.write(f"{len(referenced)} referenced file(s); scanning {', '.join(directories)}")
+
+        scanned = orphaned = deleted = 0
+        batches = self.batches(directories, referenced, stems, cutoff, options['batch_size'])
+        for batch, batch_scanned in batches:
+            batch_orphaned, batch_deleted = self.collect(batch, options['dry_run'])
+            scanned += batch_scanned
+            orphaned += batch_orphaned
+            deleted += batch_deleted
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Scanned {scanned} file(s), {orphaned} would be deleted"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Scanned {scanned} file(s), deleted {deleted} of {orphaned} orphaned"))
+
+    def batches(self, directories, referenced, stems, cutoff, size):
+        """Lists of up to `size` unreferenced files, each with the count of files scanned for it"""
+        batch = []
+        scanned = 0
+        for directory in directories:
+            for name, entry in walk(settings.MEDIA_ROOT, directory):
+                scanned += 1
+                if name in referenced or entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                    continue
+                parent, filename = posixpath.split(name)
+                if posixpath.basename(parent) == DERIVATIVES_DIR:
+                    if (posixpath.dirname(parent), derivative_stem(filename)) in stems:
+                        continue
+                batch.append(name)
+                if len(batch) >= size:
+                    yield batch, scanned
+                    batch, scanned = [], 0
+        yield batch, scanned
+
+    def collect(self, batch, dry_run):
+        """Delete the files of a batch still unreferenced; returns (orphaned, deleted)"""
+        if not batch:
+            return 0, 0
+        # Rows added since the reference set was read may point at some of these
+        still_referenced = referenced_names(batch)
+        orphans = [name for name in batch if name not in still_referenced]
+        deleted = 0
+        for name in orphans:
+            if dry_run:
+                self.stdout.write(name)
+            elif delete_file(name):
+                deleted += 1
+        return len(orphans), deleted
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from portfolio.related import compute_all
+
+
+class Command(BaseCommand):
+    help = "Recompute the related projects of every project"
+
+    def handle(self, *args, **options):
+        count = compute_all()
+        self.stdout.write(self.style.SUCCESS(f"Computed related projects for {count} project(s)"))
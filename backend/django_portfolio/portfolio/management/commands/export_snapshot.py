@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from portfolio.snapshot import export_snapshot
+
+
+class Command(BaseCommand):
+    help = "Render the public API to static, precompressed JSON files with a manifest"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help="Only regenerate this logical path (e.g. projects/featured.json); repeatable",
+        )
+        parser.add_argument('--root', help="Output directory (default: SNAPSHOT_ROOT)")
+
+    def handle(self, *args, **options):
+        root = options['root'] or settings.SNAPSHOT_ROOT
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        changed = export_snapshot(paths=options['paths'], root=root, log=log)
+        if changed:
+            self.stdout.write(self.style.SUCCESS(f"Updated {len(changed)} file(s) in {root}"))
+        else:
+            self.stdout.write(f"Snapshot in {root} is up to date")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.importer import import_projects
+
+
+class Command(BaseCommand):
+    help = "Import projects from an NDJSON manifest and a ZIP file or directory of images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest', help="NDJSON file, one project per line")
+        parser.add_argument('images', help="ZIP file or directory the manifest's image paths are relative to")
+        parser.add_argument('--workers', type=int, help="Image processes (default: IMPORT_WORKERS)")
+        parser.add_argument('--batch-size', type=int, help="Projects per transaction (default: IMPORT_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['manifest'], 'rb') as manifest:
+                result = import_projects(
+                    manifest,
+                    options['images'],
+                    workers=options['workers'],
+                    batch_size=options['batch_size'],
+                    progress=self.stdout.write,
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in result.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(result.created)} project(s), skipped {len(result.skipped)} existing, "
+            f"{len(result.errors)} error(s)"
+        ))
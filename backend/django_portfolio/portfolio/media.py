@@ -0,0 +1,180 @@
+"""
+Serving of uploaded media files.
+
+Files are sent with an ETag and Last-Modified, so revalidations are
+answered with 304, and with single byte range support for resumed or
+partial downloads. With MEDIA_SENDFILE set, the front server does the
+transfer instead (`X-Sendfile` for Apache/lighttpd, `X-Accel-Redirect` for
+nginx), and handles ranges itself.
+
+ContentHashedStorage, the default storage, puts a digest of the content in
+the name of every uploaded original (`name.<hex hash>.ext`). Those files,
+and the derivatives named after them, never change and are cached as
+immutable.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import urllib.parse
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .images import DERIVATIVES_DIR
+
+HASH_LENGTH = 12
+# An original's hashed name, or one of its derivatives (see portfolio.images)
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{%d}(-\d+w)?\.[^./]+$' % HASH_LENGTH)
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+class ContentHashedStorage(FileSystemStorage):
+    """
+    File system storage saving originals as `name.<digest>.ext`, so a
+    replaced file always gets a new URL. Derivatives already carry their
+    original's digest and are saved under the name they are given.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if posixpath.basename(posixpath.dirname(name)) != DERIVATIVES_DIR:
+            root, extension = os.path.splitext(name)
+            digest = content_digest(content)
+            # Saving a file under its hashed name again keeps that name
+            if not root.endswith(f".{digest}"):
+                suffix = f".{digest}{extension}"
+                if max_length is not None:
+                    # Shorten the name rather than let get_available_name cut the digest
+                    root = root[:max_length - len(suffix)]
+                name = root + suffix
+        return super().save(name, content, max_length)
+
+
+def media_path(name):
+    """Filesystem path of a stored media file, or Http404"""
+    try:
+        path = default_storage.path(name)
+    except (NotImplementedError, SuspiciousFileOperation):
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    return path
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single `bytes=` range, end inclusive; None to send the
+    whole file (no, malformed or multiple ranges); 'unsatisfiable' if the
+    range lies outside the file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'unsatisfiable'
+    return start, end
+
+
+def file_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def offloaded(name, path, content_type):
+    """Empty response telling the front server to send the file itself"""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'nginx':
+        response['X-Accel-Redirect'] = urllib.parse.quote(settings.MEDIA_SENDFILE_PREFIX + name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    name = path
+    path = media_path(name)
+    stat = os.stat(path)
+    size = stat.st_size
+    # Same shape as nginx's: changes whenever the file is replaced
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': (
+            IMMUTABLE if HASHED_NAME_RE.search(name)
+            else f"public, max-age={settings.MEDIA_CACHE_SECONDS}"
+        ),
+        'Accept-Ranges': 'bytes',
+    }
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        for header, value in headers.items():
+            not_modified[header] = value
+        return not_modified
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if settings.MEDIA_SENDFILE:
+        response = offloaded(name, path, content_type)
+    else:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        # If-Range: only resume when the file is still the one the client has
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range is not None and if_range != etag:
+            byte_range = None
+
+        if byte_range == 'unsatisfiable':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(file_range(path, start, length), status=206, content_type=content_type)
+            response['Content-Range'] = f"bytes {start}-{end}/{size}"
+            response['Content-Length'] = str(length)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
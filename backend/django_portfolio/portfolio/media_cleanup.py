@@ -0,0 +1,141 @@
+"""
+Removal of the media files of deleted rows.
+
+Deleting a ProjectImage (directly, through its project's cascade, or when
+ProjectSerializer.update replaces images) or a Skill leaves its file in
+storage. The post_delete handlers in portfolio.signals hand the file names
+over here once the deleting transaction commits, never before, as a
+rollback must keep them. A background thread then removes each file along
+with its derivatives (see portfolio.images), skipping names that a row
+still points at, so the request never waits for the storage.
+
+Serverless processes may be frozen as soon as the response is sent, so
+with MEDIA_CLEANUP_IN_BACKGROUND off the files are removed right away on
+commit instead. Files missed either way, e.g. queued by a process that was
+killed, are found by `manage.py collect_media_garbage`.
+"""
+import atexit
+import os
+import posixpath
+import queue
+import threading
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .images import DERIVATIVES_DIR, derivative_stem
+from .models import Project, ProjectImage, Skill
+
+_queue = queue.Queue()  # lists of file names to remove
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def referenced_names(names=None):
+    """
+    Stored file names that rows point at, limited to `names` when given,
+    read in a single UNION query.
+    """
+    # Default orderings aren't allowed in the parts of a UNION
+    images = ProjectImage.objects.order_by().values_list('image', flat=True)
+    main_images = Project.objects.order_by().values_list('main_image', flat=True)
+    icons = Skill.objects.order_by().values_list('icon', flat=True)
+    if names is not None:
+        names = list(names)
+        images = images.filter(image__in=names)
+        main_images = main_images.filter(main_image__in=names)
+        icons = icons.filter(icon__in=names)
+    return {name for name in images.union(main_images, icons) if name}
+
+
+def delete_file(name):
+    try:
+        default_storage.delete(name)
+        return True
+    except OSError as e:
+        print(f"Removing media file {name} failed: {e}")
+        return False
+
+
+def remove_files(names):
+    """
+    Delete stored files and their derivatives, except those still
+    referenced. Returns the number of files deleted.
+    """
+    names = set(names) - referenced_names(names)
+    removed = 0
+    stems = {}  # directory -> stems of the removed originals in it
+    for name in names:
+        directory, filename = posixpath.split(name)
+        stems.setdefault(directory, set()).add(os.path.splitext(filename)[0])
+        removed += delete_file(name)
+    # One listing per directory, however many of its images went
+    for directory, directory_stems in stems.items():
+        derivatives = posixpath.join(directory, DERIVATIVES_DIR)
+        try:
+            _, filenames = default_storage.listdir(derivatives)
+        except (FileNotFoundError, NotImplementedError):
+            continue
+        for filename in filenames:
+            if derivative_stem(filename) in directory_stems:
+                removed += delete_file(posixpath.join(derivatives, filename))
+    return removed
+
+
+def _take_queued():
+    names = set()
+    while True:
+        try:
+            names.update(_queue.get_nowait())
+        except queue.Empty:
+            return names
+
+
+def _remove_logged(names):
+    # Cleaning up must never fail the request or kill the worker
+    try:
+        remove_files(names)
+    except Exception as e:
+        print(f"Removing media files failed: {e}")
+
+
+def _work():
+    while True:
+        names = set(_queue.get())
+        # Whatever else is queued by now, e.g. the rest of a project's
+        # cascade, goes in the same batch and reference query
+        names.update(_take_queued())
+        _remove_logged(names)
+        # The worker's own connection would otherwise stay open
+        connection.close()
+
+
+def _start_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name='media-cleanup', daemon=True)
+            _worker.start()
+
+
+def enqueue_removal(names):
+    if not settings.MEDIA_CLEANUP_IN_BACKGROUND:
+        _remove_logged(names)
+        return
+    _queue.put(names)
+    _start_worker()
+
+
+def schedule_removal(names):
+    """Remove stored files and their derivatives once the current transaction commits"""
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: enqueue_removal(names))
+
+
+@atexit.register
+def _remove_on_exit():
+    names = _take_queued()
+    if names:
+        _remove_logged(names)
@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/msgpack')
+ACCEPT_ENCODING_RE = re.compile(r'([a-z*]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?', re.I)
+
+
+def accepted_encodings(header):
+    """Encodings from an Accept-Encoding header that the client doesn't refuse"""
+    accepted = set()
+    for name, q in ACCEPT_ENCODING_RE.findall(header or ''):
+        try:
+            if q and float(q) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.lower())
+    return accepted
+
+
+def is_shared_cacheable(response):
+    """True if Cache-Control lets shared caches keep this response for a while"""
+    directives = {}
+    for part in response.get('Cache-Control', '').split(','):
+        name, _, value = part.strip().partition('=')
+        directives[name.lower()] = value
+    if {'private', 'no-store', 'no-cache'} & directives.keys():
+        return False
+    for name in ('s-maxage', 'max-age'):
+        try:
+            if int(directives.get(name) or 0) > 0:
+                return True
+        except ValueError:
+            pass
+    return False
+
+
+def compress(content, encoding, thorough=False):
+    """Compress bytes; `thorough` trades CPU for size when the result is reused"""
+    if encoding == 'br':
+        return brotli.compress(content, quality=11 if thorough else 5)
+    return gzip.compress(content, compresslevel=9 if thorough else 6, mtime=0)
+
+
+class APICompressionMiddleware:
+    """
+    Compress API responses with brotli or gzip according to Accept-Encoding.
+
+    Responses that are shareable according to their Cache-Control (the ones
+    served through the cache layer) get their compressed bytes cached too,
+    keyed by a digest of the raw payload, so a hot response is compressed
+    once instead of on every hit.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.should_compress(request, response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if 'br' in accepted and brotli is not None:
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        else:
+            return response
+
+        content = response.content
+        if is_shared_cacheable(response):
+            digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+            key = f"api-compressed:{encoding}:{digest}"
+            compressed = cache.get(key)
+            if compressed is None:
+                compressed = compress(content, encoding, thorough=True)
+                cache.set(key, compressed, settings.API_COMPRESSION_CACHE_SECONDS)
+        else:
+            compressed = compress(content, encoding)
+
+        if len(compressed) >= len(content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The compressed body is a different representation of the resource
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    def should_compress(self, request, response):
+        if not request.path.startswith(settings.API_COMPRESSION_PATH_PREFIX):
+            return False
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return False
+        if response.streaming or response.has_header('Content-Encoding'):
+            return False
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return False
+        return len(response.content) >= settings.API_COMPRESSION_MIN_LENGTH
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:12
+
+from django.db import migrations, models
+
+from portfolio.utils import parse_display_date
+
+
+def backfill_date_sort(apps, schema_editor):
+    Project = apps.get_model('portfolio', 'Project')
+    projects = list(Project.objects.only('id', 'date'))
+    for project in projects:
+        project.date_sort, project.date_precision = parse_display_date(project.date)
+    Project.objects.bulk_update(projects, ['date_sort', 'date_precision'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='date_precision',
+            field=models.CharField(blank=True, choices=[('year', 'Year'), ('month', 'Month'), ('day', 'Day')], editable=False, max_length=5),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='date_sort',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_date_sort, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:14
+
+from django.db import migrations, models
+
+
+def backfill_denormalized(apps, schema_editor):
+    Project = apps.get_model('portfolio', 'Project')
+    ProjectImage = apps.get_model('portfolio', 'ProjectImage')
+    ProjectTag = apps.get_model('portfolio', 'ProjectTag')
+
+    main_images = {}
+    for project_id, image in (ProjectImage.objects
+                              .order_by('project_id', '-is_main', 'order', 'id')
+                              .values_list('project_id', 'image')):
+        main_images.setdefault(project_id, image)
+
+    tag_names = {}
+    for project_id, name in (ProjectTag.objects
+                             .order_by('id')
+                             .values_list('project_id', 'tag__name')):
+        tag_names.setdefault(project_id, []).append(name)
+
+    projects = list(Project.objects.only('id'))
+    for project in projects:
+        project.main_image = main_images.get(project.id, '')
+        project.tag_names = tag_names.get(project.id, [])
+    Project.objects.bulk_update(projects, ['main_image', 'tag_names'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0002_project_date_sort'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='main_image',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tag_names',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(backfill_denormalized, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_project_denormalized_cards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='portfolio.project')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_from', to='portfolio.project')),
+            ],
+            options={
+                'ordering': ['project', 'rank'],
+                'indexes': [models.Index(fields=['project', 'rank'], name='portfolio_r_project_8af0e2_idx')],
+                'unique_together': {('project', 'related')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_related_projects'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='popularity',
+            field=models.FloatField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='views',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+# Must stay identical to MESSAGE_SEARCH_DOCUMENT in portfolio.filters so
+# Postgres uses the index for searches
+SEARCH_DOCUMENT = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(email, '') || ' ' || "
+    "coalesce(subject, '') || ' ' || coalesce(message, ''))"
+)
+
+
+def backfill_unread_counter(apps, schema_editor):
+    Counter = apps.get_model('portfolio', 'Counter')
+    Message = apps.get_model('portfolio', 'Message')
+    Counter.objects.update_or_create(
+        name='unread_messages',
+        defaults={'value': Message.objects.filter(is_read=False).count()},
+    )
+
+
+def create_search_index(apps, schema_editor):
+    # Full text search is Postgres only; other databases search with LIKE
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS portfolio_message_search ON portfolio_message USING GIN ({SEARCH_DOCUMENT})"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS portfolio_message_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0005_project_view_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_unread_counter, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_site_settings(apps, schema_editor):
+    SiteSettings = apps.get_model('portfolio', 'SiteSettings')
+    SiteSettings.objects.get_or_create(pk=1, defaults={'contact_email': settings.DEFAULT_FROM_EMAIL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0006_message_counters_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteSettings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site_title', models.CharField(default='DesignSpace', max_length=200)),
+                ('site_description', models.TextField(blank=True, default='A showcase of innovative graphic design work across typography, print, and digital media.')),
+                ('contact_email', models.EmailField(blank=True, max_length=254)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Site Settings',
+            },
+        ),
+        migrations.RunPython(create_site_settings, migrations.RunPython.noop),
+    ]
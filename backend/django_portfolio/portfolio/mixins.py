@@ -0,0 +1,160 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+
+from . import http_cache
+
+
+def parse_field_list(value):
+    """Turn a comma separated query parameter into a set, or None if absent"""
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin honouring `?fields=a,b` and `?expand=x,y` on reads.
+
+    `fields` limits the response to the named fields. `expand` decides which
+    of `Meta.expandable_fields` (nested or otherwise costly fields) are
+    included; when it is absent they follow `fields` as usual.
+    """
+
+    @classmethod
+    def sparse_field_names(cls, query_params):
+        """Field names requested by the query string, or None for all of them"""
+        requested = parse_field_list(query_params.get('fields'))
+        expand = parse_field_list(query_params.get('expand'))
+        if requested is None and expand is None:
+            return None
+
+        declared = set(cls.Meta.fields)
+        expandable = set(getattr(cls.Meta, 'expandable_fields', ())) & declared
+        names = declared if requested is None else requested & declared
+        if expand is not None:
+            names = (names - expandable) | (expand & expandable)
+        if 'id' in declared:
+            names.add('id')
+        return names
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return fields
+
+        # Only the top level serializer reacts; nested ones share the context
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+
+        names = self.sparse_field_names(request.query_params)
+        if names is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in names}
+
+
+class SparseFieldsetMixin:
+    """
+    Viewset mixin that makes `?fields=`/`?expand=` cheaper in the database too:
+    only the columns behind the requested fields are selected and only the
+    requested relations are prefetched.
+
+    Serializer method fields map to their columns through
+    `Meta.field_columns`; unmapped ones disable the column trimming.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.sparse_actions:
+            return queryset
+        return self.apply_sparse_fieldset(queryset)
+
+    def apply_sparse_fieldset(self, queryset):
+        serializer_class = self.get_serializer_class()
+        # Built without the request so every declared field is present
+        fields = serializer_class().fields
+        names = None
+        if hasattr(serializer_class, 'sparse_field_names'):
+            names = serializer_class.sparse_field_names(self.request.query_params)
+        if names is None:
+            names = set(fields)
+
+        model = queryset.model
+        field_columns = getattr(serializer_class.Meta, 'field_columns', {})
+        columns = {model._meta.pk.name}
+        prefetches = []
+        trim_columns = True
+        for name in names:
+            if name in field_columns:
+                columns.update(field_columns[name])
+                continue
+            field = fields.get(name)
+            if field is None:
+                continue
+            if field.source == '*':
+                trim_columns = False
+                continue
+            try:
+                model_field = model._meta.get_field(field.source.split('.')[0])
+            except FieldDoesNotExist:
+                trim_columns = False
+                continue
+            if model_field.one_to_many or model_field.many_to_many:
+                prefetches.append(model_field.name)
+            else:
+                columns.add(model_field.name)
+
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        if trim_columns and names != set(fields):
+            queryset = queryset.only(*columns)
+        return queryset
+
+
+class CachePolicyMixin:
+    """
+    View mixin applying the shared cache policy of portfolio.http_cache to
+    successful GETs: public with surrogate keys for anonymous requests,
+    private otherwise.
+
+    `surrogate_keys` are the generation groups every response depends on,
+    `surrogate_collection` the group added to list-type (non-detail)
+    responses and `surrogate_object` the model name used to key each object
+    in the response body by its id. Responses of `private_actions` (e.g.
+    admin-only exports) are never stored by any cache.
+    """
+    surrogate_keys = ()
+    surrogate_collection = None
+    surrogate_object = None
+    private_actions = ()
+
+    def get_surrogate_keys(self, response):
+        """(group keys, object keys) of a response"""
+        groups = list(self.surrogate_keys)
+        if self.surrogate_collection and not getattr(self, 'detail', False):
+            groups.append(self.surrogate_collection)
+        objects = []
+        if self.surrogate_object:
+            objects = [
+                http_cache.object_key(self.surrogate_object, pk)
+                for pk in http_cache.response_object_ids(response.data)
+            ]
+        return groups, objects
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'action', None) in self.private_actions:
+            response['Cache-Control'] = 'private, no-store'
+            return response
+        # Streamed and other non-DRF responses have no data to take keys from
+        if not isinstance(response, Response) or response.streaming:
+            return response
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        groups, objects = self.get_surrogate_keys(response)
+        return http_cache.set_cache_headers(request, response, groups, objects)
@@ -1,19 +1,45 @@
-from django.db import models
+from django.db import models, transaction
+from django.conf import settings
+from django.db.models import F
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.utils.text import slugify
+from . import images
+from .utils import (
+    parse_display_date, DATE_PRECISION_YEAR, DATE_PRECISION_MONTH, DATE_PRECISION_DAY
+)
 
 class Project(models.Model):
     """Model for portfolio projects"""
+    DATE_PRECISIONS = (
+        (DATE_PRECISION_YEAR, 'Year'),
+        (DATE_PRECISION_MONTH, 'Month'),
+        (DATE_PRECISION_DAY, 'Day'),
+    )
+
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     category = models.CharField(max_length=100)
     description = models.TextField()
     client = models.CharField(max_length=200, blank=True, null=True)
     date = models.CharField(max_length=50)  # Could be "2023", "Jan 2023", etc.
+    # Normalized form of `date` used for ordering and range filters
+    date_sort = models.DateField(blank=True, null=True, db_index=True, editable=False)
+    date_precision = models.CharField(max_length=5, choices=DATE_PRECISIONS, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     featured = models.BooleanField(default=False)
+    # Denormalized copies of the main image and tag names so list views can
+    # render cards from this table alone. Kept in sync by portfolio.signals.
+    main_image = models.CharField(max_length=255, blank=True, editable=False)
+    tag_names = models.JSONField(default=list, blank=True, editable=False)
+    # View count and forward-decayed popularity, written in batches by
+    # portfolio.counters
+    views = models.PositiveIntegerField(default=0, editable=False)
+    popularity = models.FloatField(default=0, db_index=True, editable=False)
+
+    DENORMALIZED_FIELDS = ('main_image', 'tag_names')
+    COUNTER_FIELDS = ('views', 'popularity')
     
     def __str__(self):
         return self.title
@@ -29,8 +55,53 @@ class Project(models.Model):
             while Project.objects.filter(slug=self.slug).exists():
                 self.slug = f"{original_slug}-{count}"
                 count += 1
-                
+
+        self.date_sort, self.date_precision = parse_display_date(self.date)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'date' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'date_sort', 'date_precision'}
+
+        # Never write back stale denormalized values or counters on a plain
+        # save; they are only ever changed through sync_main_image/
+        # sync_tag_names and the batched counter updates
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            skipped = self.DENORMALIZED_FIELDS + self.COUNTER_FIELDS
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
+
         super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets portfolio.signals tell whether a save changed the category
+        instance._loaded_category = instance.__dict__.get('category')
+        return instance
+
+    @classmethod
+    def sync_main_image(cls, project_id):
+        """Copy the main image (or the first one) onto the project row"""
+        name = (
+            ProjectImage.objects.filter(project_id=project_id)
+            .order_by('-is_main', 'order', 'id')
+            .values_list('image', flat=True)
+            .first()
+        ) or ''
+        cls.objects.filter(pk=project_id).update(main_image=name)
+        return name
+
+    @classmethod
+    def sync_tag_names(cls, project_id):
+        """Copy the project's tag names onto the project row"""
+        names = list(
+            ProjectTag.objects.filter(project_id=project_id)
+            .order_by('id')
+            .values_list('tag__name', flat=True)
+        )
+        cls.objects.filter(pk=project_id).update(tag_names=names)
+        return names
     
     class Meta:
         ordering = ['-created_at']
@@ -42,10 +113,40 @@ class ProjectImage(models.Model):
     is_main = models.BooleanField(default=False)
     alt_text = models.CharField(max_length=200, blank=True)
     order = models.IntegerField(default=0)
+    # Read from the file on upload (portfolio.images.image_metadata) so
+    # clients can lay out and preview images before loading them.
+    # Deliberately not ImageField.width_field/height_field, which open the
+    # file whenever an instance without them is loaded.
+    width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    dominant_color = models.CharField(max_length=7, blank=True, editable=False)
+    placeholder = models.TextField(blank=True, editable=False)  # data URI
+    
+    METADATA_FIELDS = ('width', 'height', 'dominant_color', 'placeholder')
     
     def __str__(self):
         return f"Image for {self.project.title}"
     
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            # A new upload, not yet written to storage
+            self.update_metadata()
+        super().save(*args, **kwargs)
+    
+    def update_metadata(self):
+        """Fill in the metadata fields from the image file; left empty if it can't be read"""
+        try:
+            self.image.open('rb')
+            metadata = images.read_metadata(self.image, self.image.name)
+        except (images.ImageValidationError, OSError) as e:
+            print(f"Reading metadata of {self.image.name} failed: {e}")
+            return
+        finally:
+            if not self.image.closed:
+                self.image.seek(0)
+        for field, value in metadata.items():
+            setattr(self, field, value)
+    
     class Meta:
         ordering = ['order']
 
@@ -67,6 +168,67 @@ class ProjectTag(models.Model):
     class Meta:
         unique_together = ('project', 'tag')
 
+class RelatedProject(models.Model):
+    """Precomputed "related projects" of a project, best match first"""
+    project = models.ForeignKey(Project, related_name='related_links', on_delete=models.CASCADE)
+    related = models.ForeignKey(Project, related_name='related_from', on_delete=models.CASCADE)
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    def __str__(self):
+        return f"{self.project_id} -> {self.related_id} ({self.score:.3f})"
+
+    class Meta:
+        ordering = ['project', 'rank']
+        unique_together = ('project', 'related')
+        indexes = [models.Index(fields=['project', 'rank'])]
+
+class Counter(models.Model):
+    """Named counters kept exact with relative updates in the changing transaction"""
+    UNREAD_MESSAGES = 'unread_messages'
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def add(cls, name, delta):
+        if delta:
+            cls.objects.filter(name=name).update(value=F('value') + delta)
+
+    @classmethod
+    def get_value(cls, name):
+        return cls.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+class MessageQuerySet(models.QuerySet):
+    """
+    Set-based message operations that keep the unread counter exact.
+
+    Each runs as conditional statements whose row counts give the counter
+    delta, in the same transaction, so concurrent changes can't skew it.
+    """
+
+    def mark_read(self):
+        with transaction.atomic():
+            count = self.filter(is_read=False).update(is_read=True)
+            Counter.add(Counter.UNREAD_MESSAGES, -count)
+        return count
+
+    def mark_unread(self):
+        with transaction.atomic():
+            count = self.filter(is_read=True).update(is_read=False)
+            Counter.add(Counter.UNREAD_MESSAGES, count)
+        return count
+
+    def delete(self):
+        with transaction.atomic():
+            unread, _ = super(MessageQuerySet, self.filter(is_read=False)).delete()
+            read, _ = super(MessageQuerySet, self.filter(is_read=True)).delete()
+            Counter.add(Counter.UNREAD_MESSAGES, -unread)
+        return unread + read, {self.model._meta.label: unread + read}
+
 class Message(models.Model):
     """Contact form submissions"""
     name = models.CharField(max_length=100)
@@ -75,9 +237,30 @@ class Message(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+
+    objects = MessageQuerySet.as_manager()
     
     def __str__(self):
         return f"Message from {self.name} - {self.created_at.strftime('%Y-%m-%d')}"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'is_read' not in update_fields:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            was_unread = False
+            if not self._state.adding:
+                # Lock the row so a concurrent change of is_read is counted once
+                current = (
+                    Message.objects.select_for_update()
+                    .filter(pk=self.pk).values_list('is_read', flat=True).first()
+                )
+                was_unread = current is False
+            super().save(*args, **kwargs)
+            Counter.add(Counter.UNREAD_MESSAGES, int(not self.is_read) - int(was_unread))
+
+    def delete(self, *args, **kwargs):
+        return Message.objects.filter(pk=self.pk).delete()
     
     class Meta:
         ordering = ['-created_at']
@@ -116,3 +299,33 @@ class Journey(models.Model):
     class Meta:
         ordering = ['order']
         verbose_name_plural = "Journey Items"
+
+class SiteSettings(models.Model):
+    """Editable site-wide settings, a single row. Read through portfolio.site_settings."""
+    SINGLETON_ID = 1
+
+    site_title = models.CharField(max_length=200, default='DesignSpace')
+    site_description = models.TextField(
+        blank=True,
+        default='A showcase of innovative graphic design work across typography, print, and digital media.',
+    )
+    contact_email = models.EmailField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.site_title
+
+    def save(self, *args, **kwargs):
+        self.pk = self.SINGLETON_ID
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def load(cls):
+        instance, _ = cls.objects.get_or_create(
+            pk=cls.SINGLETON_ID,
+            defaults={'contact_email': settings.DEFAULT_FROM_EMAIL},
+        )
+        return instance
+
+    class Meta:
+        verbose_name_plural = "Site Settings"
@@ -0,0 +1,166 @@
+"""
+Related-projects recommendations.
+
+Projects are rows of a binary project x tag matrix. Similarity is the
+Jaccard index of two projects' tag sets, computed for a whole batch of
+projects at once as a matrix product, blended with a bonus for sharing a
+category:
+
+    score = (1 - CATEGORY_WEIGHT) * jaccard + CATEGORY_WEIGHT * same_category
+
+The best RELATED_PROJECTS_COUNT matches of every project are stored in
+RelatedProject, so serving them is one indexed lookup. The tag matrix is
+a dense float32 NumPy array, projects x tags, which stays small at
+portfolio sizes; scipy.sparse isn't used as it doesn't fit the 15 MB
+serverless bundle.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .http_cache import object_key, purge_surrogate_keys
+from .models import Project, ProjectTag, RelatedProject
+from .utils import on_commit_batched
+
+# Scores of one batch are a (batch x projects) float32 array; keep it ~64 MB
+BATCH_CELLS = 16 * 1024 * 1024
+
+
+class SimilarityModel:
+    """Tag matrix and categories of every project, loaded in two queries"""
+
+    def __init__(self):
+        rows = list(Project.objects.order_by('id').values_list('id', 'category'))
+        self.project_ids = np.array([pk for pk, _ in rows], dtype=np.int64)
+        self.position = {pk: i for i, (pk, _) in enumerate(rows)}
+        category_codes = {}
+        self.categories = np.array(
+            [category_codes.setdefault(category.lower(), len(category_codes)) for _, category in rows],
+            dtype=np.int32,
+        )
+
+        assignments = list(ProjectTag.objects.values_list('project_id', 'tag_id'))
+        tag_codes = {}
+        row_index = np.array([self.position[pk] for pk, _ in assignments], dtype=np.int64)
+        col_index = np.array([tag_codes.setdefault(tag_id, len(tag_codes)) for _, tag_id in assignments],
+                             dtype=np.int64)
+        shape = (len(rows), max(len(tag_codes), 1))
+        self.tags = np.zeros(shape, dtype=np.float32)
+        self.tags[row_index, col_index] = 1
+        self.tag_counts = self.tags.sum(axis=1)
+
+    def __len__(self):
+        return len(self.project_ids)
+
+    def scores(self, positions):
+        """Similarity of the projects at `positions` to every project"""
+        weight = settings.RELATED_PROJECTS_CATEGORY_WEIGHT
+        shared = self.tags[positions] @ self.tags.T
+        union = self.tag_counts[positions, None] + self.tag_counts[None, :] - shared
+        jaccard = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+        same_category = self.categories[positions, None] == self.categories[None, :]
+        scores = (1 - weight) * jaccard + weight * same_category
+        # A project is never related to itself
+        scores[np.arange(len(positions)), positions] = 0
+        return scores
+
+    def top_matches(self, positions, count):
+        """
+        {project_id: [(related_id, score), ...]} for the projects at
+        `positions`, best first. Ties are broken by the lower project id so
+        results don't depend on how rows are batched.
+        """
+        result = {}
+        batch_size = max(1, BATCH_CELLS // max(len(self), 1))
+        for start in range(0, len(positions), batch_size):
+            batch = np.asarray(positions[start:start + batch_size], dtype=np.int64)
+            scores = self.scores(batch)
+            k = min(count, scores.shape[1])
+            if k == 0:
+                result.update((int(self.project_ids[p]), []) for p in batch)
+                continue
+            kth = np.partition(scores, -k, axis=1)[:, -k]
+            for row, position in enumerate(batch):
+                # Columns are in id order, so the first ties are the lowest ids
+                above = np.flatnonzero(scores[row] > kth[row])
+                ties = np.flatnonzero(scores[row] == kth[row])[:k - len(above)]
+                chosen = np.concatenate([above, ties])
+                chosen = chosen[np.lexsort((self.project_ids[chosen], -scores[row, chosen]))]
+                result[int(self.project_ids[position])] = [
+                    (int(self.project_ids[col]), float(scores[row, col]))
+                    for col in chosen if scores[row, col] > 0
+                ]
+        return result
+
+
+def save_matches(matches):
+    """Replace the stored related projects of the projects in `matches`"""
+    links = [
+        RelatedProject(project_id=project_id, related_id=related_id, score=score, rank=rank)
+        for project_id, related in matches.items()
+        for rank, (related_id, score) in enumerate(related)
+    ]
+    with transaction.atomic():
+        RelatedProject.objects.filter(project_id__in=list(matches)).delete()
+        RelatedProject.objects.bulk_create(links, batch_size=1000)
+        # Their detail responses show the related cards
+        on_commit_batched('surrogate-keys', [object_key('project', pk) for pk in matches], purge_surrogate_keys)
+        if settings.SNAPSHOT_AUTO_EXPORT:
+            from .snapshot import detail_path, export_snapshot
+            on_commit_batched('snapshot', [detail_path(pk) for pk in matches], export_snapshot)
+
+
+def compute_all():
+    """Recompute the related projects of every project"""
+    model = SimilarityModel()
+    count = settings.RELATED_PROJECTS_COUNT
+    matches = model.top_matches(np.arange(len(model)), count)
+    with transaction.atomic():
+        RelatedProject.objects.all().delete()
+        save_matches(matches)
+    return len(matches)
+
+
+def update_related(project_ids):
+    """
+    Refresh related projects after the tags or category of `project_ids`
+    changed (or they were created or deleted).
+
+    Besides the changed projects themselves, only projects whose stored
+    list may be affected are recomputed: those listing a changed project,
+    and those for which a changed project now outranks their last match.
+    """
+    model = SimilarityModel()
+    count = settings.RELATED_PROJECTS_COUNT
+    changed = [model.position[pk] for pk in project_ids if pk in model.position]
+
+    affected = set(
+        RelatedProject.objects.filter(related_id__in=list(project_ids))
+        .values_list('project_id', flat=True)
+    )
+    affected.update(int(model.project_ids[position]) for position in changed)
+
+    if changed:
+        # Last (weakest) match of every full list; lists shorter than
+        # `count` already hold every project with a positive score
+        weakest = np.zeros(len(model), dtype=np.float32)
+        weakest_id = np.full(len(model), -1, dtype=np.int64)
+        last = RelatedProject.objects.filter(rank=count - 1).values_list('project_id', 'score', 'related_id')
+        for project_id, score, related_id in last:
+            position = model.position.get(project_id)
+            if position is not None:
+                weakest[position] = score
+                weakest_id[position] = related_id
+        # Similarity is symmetric, so the changed rows give every project's
+        # score against the changed projects
+        changed = np.asarray(changed, dtype=np.int64)
+        scores = model.scores(changed)
+        changed_ids = model.project_ids[changed][:, None]
+        outranks = (scores > weakest[None, :]) | (
+            (scores == weakest[None, :]) & (scores > 0) & (changed_ids < weakest_id[None, :])
+        )
+        affected.update(int(pk) for pk in model.project_ids[outranks.any(axis=0)])
+
+    positions = sorted(model.position[pk] for pk in affected if pk in model.position)
+    save_matches(model.top_matches(positions, count))
+    return affected
@@ -0,0 +1,97 @@
+"""
+Fast JSON and MessagePack renderers/parsers for DRF.
+
+orjson and msgpack are optional: without orjson the JSON classes behave
+exactly like DRF's own, and the MessagePack classes are only offered for
+content negotiation when msgpack is installed.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
+_drf_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Encode what orjson/msgpack can't (Decimal, lazy strings, datetimes...) like DRF does"""
+    return _drf_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson, producing the same output as DRF's"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        # Datetimes go through DRF's encoder so their format doesn't change
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        try:
+            ret = orjson.dumps(data, default=_default, option=option)
+        except TypeError:
+            # e.g. integers beyond 64 bits; let the stdlib encoder have a go
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Match DRF, which escapes these for embedding in JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by orjson"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = (parser_context.get('encoding') or 'utf-8').lower()
+        if orjson is None or encoding not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renders responses as MessagePack for clients sending `Accept: application/msgpack`"""
+    media_type = MSGPACK_MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """Parses MessagePack request bodies"""
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
+
+
+# Body parsers for views that pick their own parser_classes
+DATA_PARSER_CLASSES = (FastJSONParser,) + ((MessagePackParser,) if msgpack is not None else ())
@@ -1,5 +1,11 @@
 from rest_framework import serializers
-from .models import Project, ProjectImage, Tag, ProjectTag, Message, Skill, Journey
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from .models import Project, ProjectImage, Tag, ProjectTag, Message, Skill, Journey, SiteSettings
+from .mixins import SparseFieldsMixin
+from . import images
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 import json
@@ -10,29 +16,73 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
         read_only_fields = ['id']
 
-class TagSerializer(serializers.ModelSerializer):
+def clean_uploaded_image(upload):
+    """Size-checked copy of an uploaded image without its metadata (see portfolio.images)"""
+    try:
+        data = images.clean_image(upload, upload.name, settings.IMAGE_MAX_PIXELS, settings.IMAGE_MAX_UPLOAD_BYTES)
+    except images.ImageValidationError as e:
+        raise serializers.ValidationError(str(e))
+    return ContentFile(data, name=upload.name)
+
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name']
 
-class ProjectImageSerializer(serializers.ModelSerializer):
+class ProjectImageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ProjectImage
-        fields = ['id', 'image', 'is_main', 'alt_text', 'order']
+        fields = ['id', 'image', 'is_main', 'alt_text', 'order', 'width', 'height', 'dominant_color', 'placeholder']
+        read_only_fields = ['width', 'height', 'dominant_color', 'placeholder']
+
+    def validate_image(self, value):
+        return clean_uploaded_image(value)
+
+class MainImageField(serializers.ReadOnlyField):
+    """Renders the denormalized main image path as an absolute media URL"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = default_storage.url(value)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+class ProjectCardSerializer(serializers.ModelSerializer):
+    """Lightweight project representation read from the project table only"""
+    main_image = MainImageField()
+    tags = serializers.ListField(source='tag_names', read_only=True)
+
+    class Meta:
+        model = Project
+        fields = ['id', 'title', 'slug', 'category', 'date', 'featured', 'main_image', 'tags']
+        # Model columns needed to render the fields above, for .only()
+        columns = ['id', 'title', 'slug', 'category', 'date', 'featured', 'main_image', 'tag_names']
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     images = ProjectImageSerializer(many=True, read_only=True)
     tags = serializers.SerializerMethodField()
+    main_image = MainImageField()
     slug = serializers.CharField(required=False)  # Make slug optional
     
     class Meta:
         model = Project
         fields = ['id', 'title', 'slug', 'category', 'description', 'client', 
-                  'date', 'created_at', 'updated_at', 'featured', 'images', 'tags']
+                  'date', 'date_sort', 'date_precision', 'created_at', 'updated_at',
+                  'featured', 'main_image', 'images', 'tags', 'views']
+        read_only_fields = ['date_sort', 'date_precision', 'views']
+        expandable_fields = ['images', 'tags']
+        field_columns = {'tags': ['tag_names']}
     
     def get_tags(self, obj):
-        project_tags = ProjectTag.objects.filter(project=obj)
-        return [pt.tag.name for pt in project_tags]
+        return obj.tag_names
+
+    def clean_images(self, uploads):
+        # Check every upload before anything is saved
+        try:
+            return [clean_uploaded_image(upload) for upload in uploads]
+        except serializers.ValidationError as e:
+            raise serializers.ValidationError({'images': e.detail})
     
     def validate(self, attrs):
         # Generate slug from title if not provided
@@ -40,11 +90,12 @@ class ProjectSerializer(serializers.ModelSerializer):
             attrs['slug'] = slugify(attrs['title'])
         return attrs
     
+    @transaction.atomic
     def create(self, validated_data):
         # Extract tags and images from request data
         request = self.context.get('request')
         tags_data = request.POST.getlist('tags', [])
-        images_data = request.FILES.getlist('images', [])
+        images_data = self.clean_images(request.FILES.getlist('images', []))
         
         # Create project
         project = Project.objects.create(**validated_data)
@@ -65,10 +116,13 @@ class ProjectSerializer(serializers.ModelSerializer):
                 order=i
             )
         
+        project.refresh_from_db(fields=Project.DENORMALIZED_FIELDS)
         return project
     
+    @transaction.atomic
     def update(self, instance, validated_data):
         request = self.context.get('request')
+        images_data = self.clean_images(request.FILES.getlist('images', []))
         
         # Update basic fields
         for attr, value in validated_data.items():
@@ -88,7 +142,6 @@ class ProjectSerializer(serializers.ModelSerializer):
         
         # Update images if provided
         if request.FILES:
-            images_data = request.FILES.getlist('images', [])
             existing_images = request.POST.get('existing_images')
             
             # If replace_images flag is set or existing_images is provided, handle existing images
@@ -135,21 +188,48 @@ class ProjectSerializer(serializers.ModelSerializer):
                     ProjectImage.objects.filter(id=int(main_image_id), project=instance).update(is_main=True)
                 except (ValueError, ProjectImage.DoesNotExist):
                     pass
+
+            # Bulk updates of is_main bypass the signals
+            Project.sync_main_image(instance.pk)
         
+        instance.refresh_from_db(fields=Project.DENORMALIZED_FIELDS)
         return instance
 
-class MessageSerializer(serializers.ModelSerializer):
+class ProjectDetailSerializer(ProjectSerializer):
+    """Project detail including its precomputed related projects"""
+    related = serializers.SerializerMethodField()
+
+    class Meta(ProjectSerializer.Meta):
+        fields = ProjectSerializer.Meta.fields + ['related']
+        expandable_fields = ProjectSerializer.Meta.expandable_fields + ['related']
+        field_columns = {**ProjectSerializer.Meta.field_columns, 'related': []}
+
+    def get_related(self, obj):
+        # One query over the (project, rank) index of RelatedProject
+        related = (
+            Project.objects.filter(related_from__project=obj)
+            .order_by('related_from__rank')
+            .only(*ProjectCardSerializer.Meta.columns)
+        )
+        return ProjectCardSerializer(related, many=True, context=self.context).data
+
+class MessageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = ['id', 'name', 'email', 'subject', 'message', 'created_at', 'is_read']
         read_only_fields = ['created_at']
 
-class SkillSerializer(serializers.ModelSerializer):
+class SkillSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Skill
         fields = ['id', 'name', 'icon', 'category', 'order']
 
-class JourneySerializer(serializers.ModelSerializer):
+class JourneySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Journey
         fields = ['id', 'title', 'subtitle', 'date', 'description', 'journey_type', 'order']
+
+class SiteSettingsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SiteSettings
+        fields = ['site_title', 'site_description', 'contact_email']
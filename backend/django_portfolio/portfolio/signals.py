@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import Project, ProjectImage, Tag, ProjectTag, RelatedProject, Skill, Journey, SiteSettings
+from .cache import MODEL_GENERATIONS, bump_generations
+from .http_cache import instance_keys, purge_surrogate_keys
+from .media_cleanup import schedule_removal
+from .tag_index import tag_index
+from .utils import on_commit_batched
+
+
+@receiver([post_save, post_delete], sender=ProjectImage)
+def sync_project_main_image(sender, instance, **kwargs):
+    """Keep Project.main_image in step with its images"""
+    Project.sync_main_image(instance.project_id)
+
+
+@receiver(post_delete, sender=ProjectImage)
+@receiver(post_delete, sender=Skill)
+def remove_deleted_files(sender, instance, **kwargs):
+    """Remove the file of a deleted image or skill (and its derivatives) once the deletion commits"""
+    file = instance.image if sender is ProjectImage else instance.icon
+    schedule_removal([file.name])
+
+
+@receiver([post_save, post_delete], sender=ProjectTag)
+def sync_project_tag_names(sender, instance, **kwargs):
+    """Keep Project.tag_names in step with its tag assignments"""
+    Project.sync_tag_names(instance.project_id)
+
+
+@receiver([post_save, post_delete], sender=ProjectTag)
+def refresh_tag_index(sender, instance, **kwargs):
+    """Patch the in-process tag index once tag assignments are committed"""
+    on_commit_batched('tag-index', [instance.project_id], tag_index.refresh_projects)
+
+
+@receiver(post_save, sender=Tag)
+def sync_renamed_tag(sender, instance, created, **kwargs):
+    """A renamed tag has to be rewritten on every project using it"""
+    if created:
+        return
+    project_ids = ProjectTag.objects.filter(tag=instance).values_list('project_id', flat=True)
+    for project_id in project_ids:
+        Project.sync_tag_names(project_id)
+
+
+def update_related_projects(project_ids):
+    # Imported here so numpy is only loaded when recommendations change
+    from .related import update_related
+    update_related(project_ids)
+
+
+@receiver([post_save, post_delete], sender=ProjectTag)
+def refresh_related_projects(sender, instance, **kwargs):
+    """Recompute recommendations around a project whose tags changed"""
+    on_commit_batched('related', [instance.project_id], update_related_projects)
+
+
+@receiver(post_save, sender=Project)
+def refresh_related_of_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Recompute recommendations around a new project or one whose category changed"""
+    if not created:
+        if update_fields is not None and 'category' not in update_fields:
+            return
+        # Other edits (featuring, descriptions, ...) don't affect similarity
+        loaded = getattr(instance, '_loaded_category', None)
+        instance._loaded_category = instance.category
+        if instance.category == loaded:
+            return
+    on_commit_batched('related', [instance.pk], update_related_projects)
+
+
+@receiver(pre_delete, sender=Project)
+def refresh_related_of_deleted(sender, instance, **kwargs):
+    """Projects recommending a deleted project need a replacement"""
+    # Read before the cascade removes the links pointing at the project
+    project_ids = list(RelatedProject.objects.filter(related=instance).values_list('project_id', flat=True))
+    on_commit_batched('related', project_ids, update_related_projects)
+
+
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=ProjectImage)
+@receiver([post_save, post_delete], sender=ProjectTag)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Skill)
+@receiver([post_save, post_delete], sender=Journey)
+@receiver([post_save, post_delete], sender=SiteSettings)
+def invalidate_cached_data(sender, instance, **kwargs):
+    """Bump the cache generations depending on this model once the change commits"""
+    # On commit, so a request racing the transaction can't cache old data
+    # under the new generation
+    on_commit_batched('generations', MODEL_GENERATIONS[sender._meta.model_name], bump_generations)
+
+
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=ProjectImage)
+@receiver([post_save, post_delete], sender=ProjectTag)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Skill)
+@receiver([post_save, post_delete], sender=Journey)
+def purge_shared_caches(sender, instance, **kwargs):
+    """Purge the CDN responses showing this instance once the change commits"""
+    on_commit_batched('surrogate-keys', instance_keys(instance), purge_surrogate_keys)
+
+
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=ProjectImage)
+@receiver([post_save, post_delete], sender=ProjectTag)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Skill)
+@receiver([post_save, post_delete], sender=Journey)
+def refresh_snapshot(sender, instance, **kwargs):
+    """Regenerate the affected static snapshot files once the change commits"""
+    if not settings.SNAPSHOT_AUTO_EXPORT:
+        return
+    # Imported here so request handling never pays for the snapshot module
+    from .snapshot import affected_paths, export_snapshot
+    on_commit_batched('snapshot', affected_paths(instance), export_snapshot)
@@ -0,0 +1,34 @@
+"""
+Process-local cache of the SiteSettings singleton.
+
+Each worker keeps the settings it last read together with the
+SITE_SETTINGS cache generation they were read at. A read compares that
+generation with the cached one (a single cache get) and only goes to the
+database when it moved. Saving SiteSettings bumps the generation on commit
+(see portfolio.signals). With a shared cache (REDIS_URL) every worker
+reloads on its next read; with the per-process default cache, other
+workers reload once the generation expires, within API_GENERATION_SECONDS.
+"""
+from .cache import SITE_SETTINGS, generations
+from .db_router import read_primary
+from .models import SiteSettings
+
+FIELDS = ('site_title', 'site_description', 'contact_email')
+
+_current = None  # (generation, settings dict)
+
+
+def get_site_settings():
+    """The current site settings as a dict; don't mutate it"""
+    global _current
+    # Read the generation before the row: a write landing in between leaves
+    # new data under the old generation, which is simply reloaded next time
+    generation, = generations([SITE_SETTINGS])
+    current = _current
+    if current is not None and current[0] == generation:
+        return current[1]
+    # From the primary, for the same reason as cached API data
+    instance = read_primary(SiteSettings.load)()
+    data = {field: getattr(instance, field) for field in FIELDS}
+    _current = (generation, data)
+    return data
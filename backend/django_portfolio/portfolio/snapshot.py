@@ -0,0 +1,214 @@
+"""
+Static JSON snapshot of the public API.
+
+Every public read endpoint is rendered to a content-hashed file (plus
+precompressed .gz/.br siblings) under SNAPSHOT_ROOT, with a manifest.json
+mapping logical paths such as "projects/featured.json" to those files. A
+CDN or the frontend can then serve reads without any Python in the path.
+
+Output matches the API serializers and renderer byte for byte, except
+that lists are not paginated.
+"""
+import gzip
+import hashlib
+import json
+import os
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.test import RequestFactory
+from django.utils import timezone
+from django.utils.text import slugify
+from rest_framework.request import Request
+
+from .middleware import brotli
+from .models import Project, ProjectImage, ProjectTag, RelatedProject, Tag, Skill, Journey
+from .renderers import FastJSONRenderer
+from .serializers import (
+    ProjectSerializer, ProjectDetailSerializer, TagSerializer, SkillSerializer, JourneySerializer
+)
+
+MANIFEST_NAME = 'manifest.json'
+
+# Paths whose content depends on every project
+PROJECT_LISTS = '@project-lists'
+ALL_PROJECT_DETAILS = '@project-details'
+
+
+def snapshot_request():
+    """A GET request on SNAPSHOT_BASE_URL, so media URLs come out absolute"""
+    base = urlsplit(settings.SNAPSHOT_BASE_URL)
+    django_request = RequestFactory().get(
+        '/', HTTP_HOST=base.netloc, secure=base.scheme == 'https'
+    )
+    return Request(django_request)
+
+
+def project_queryset():
+    return Project.objects.prefetch_related('images').order_by('-created_at')
+
+
+def category_path(category):
+    return f"projects/category/{slugify(category)}.json"
+
+
+def detail_path(project_id):
+    return f"projects/{project_id}.json"
+
+
+def expand_paths(paths):
+    """Resolve the placeholder groups used by affected_paths into real paths"""
+    result = set()
+    for path in paths:
+        if path == PROJECT_LISTS:
+            result.update(['projects/index.json', 'projects/featured.json'])
+            categories = Project.objects.values_list('category', flat=True).distinct()
+            result.update(category_path(category) for category in categories)
+        elif path == ALL_PROJECT_DETAILS:
+            result.update(detail_path(pk) for pk in Project.objects.values_list('id', flat=True))
+        else:
+            result.add(path)
+    return result
+
+
+def render_path(path, request):
+    """Serialized data for one logical path, or None if it no longer exists"""
+    context = {'request': request}
+    queryset = project_queryset()
+    if path == 'projects/index.json':
+        return ProjectSerializer(queryset, many=True, context=context).data
+    if path == 'projects/featured.json':
+        return ProjectSerializer(queryset.filter(featured=True), many=True, context=context).data
+    if path.startswith('projects/category/'):
+        wanted = path[len('projects/category/'):-len('.json')]
+        categories = [c for c in Project.objects.values_list('category', flat=True).distinct()
+                      if slugify(c) == wanted]
+        if not categories:
+            return None
+        return ProjectSerializer(queryset.filter(category__in=categories), many=True, context=context).data
+    if path.startswith('projects/') and path[len('projects/'):-len('.json')].isdigit():
+        project = queryset.filter(pk=path[len('projects/'):-len('.json')]).first()
+        if project is None:
+            return None
+        return ProjectDetailSerializer(project, context=context).data
+    if path == 'tags.json':
+        return TagSerializer(Tag.objects.all(), many=True, context=context).data
+    if path == 'skills.json':
+        return SkillSerializer(Skill.objects.all(), many=True, context=context).data
+    if path == 'journey.json':
+        return JourneySerializer(Journey.objects.all(), many=True, context=context).data
+    return None
+
+
+def all_paths():
+    return expand_paths([PROJECT_LISTS, ALL_PROJECT_DETAILS, 'tags.json', 'skills.json', 'journey.json'])
+
+
+def affected_paths(instance):
+    """Logical paths whose content may change when `instance` is saved or deleted"""
+    if isinstance(instance, (Project, ProjectImage, ProjectTag)):
+        # The project may have moved category, so every list is rebuilt.
+        # Besides its own detail, its card shows in the details of the
+        # projects recommending it; details whose recommendations change
+        # are refreshed by portfolio.related once they are recomputed.
+        project_id = instance.pk if isinstance(instance, Project) else instance.project_id
+        recommending = RelatedProject.objects.filter(related_id=project_id).values_list('project_id', flat=True)
+        return {PROJECT_LISTS, detail_path(project_id)} | {detail_path(pk) for pk in recommending}
+    if isinstance(instance, Tag):
+        return {PROJECT_LISTS, ALL_PROJECT_DETAILS, 'tags.json'}
+    if isinstance(instance, Skill):
+        return {'skills.json'}
+    if isinstance(instance, Journey):
+        return {'journey.json'}
+    return set()
+
+
+def load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), 'rb') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'files': {}}
+
+
+def write_atomic(filename, content):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp = f"{filename}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, filename)
+
+
+def remove_files(root, entry):
+    name = entry['file']
+    for suffix in [''] + [f".{ext}" for ext in entry.get('encodings', ())]:
+        try:
+            os.remove(os.path.join(root, name + suffix))
+        except FileNotFoundError:
+            pass
+
+
+def export_snapshot(paths=None, root=None, log=None):
+    """
+    Render `paths` (all public paths when None) into the snapshot directory.
+
+    Files whose content hash is unchanged are left alone, so regenerating
+    after a model change only rewrites what actually changed. Returns the
+    list of logical paths that were written or removed.
+    """
+    root = root or settings.SNAPSHOT_ROOT
+    manifest = load_manifest(root)
+    files = manifest.setdefault('files', {})
+    full = paths is None
+    if full:
+        paths = all_paths()
+    else:
+        # Category lists that may have just become empty get re-checked too
+        if PROJECT_LISTS in paths:
+            paths = set(paths) | {path for path in files if path.startswith('projects/category/')}
+        paths = expand_paths(paths)
+    request = snapshot_request()
+    renderer = FastJSONRenderer()
+    changed = []
+
+    for path in sorted(paths):
+        data = render_path(path, request)
+        old = files.get(path)
+        if data is None:
+            if old is not None:
+                remove_files(root, files.pop(path))
+                changed.append(path)
+            continue
+
+        content = renderer.render(data)
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        if old is not None and old['hash'] == digest:
+            continue
+
+        stem = path[:-len('.json')]
+        name = f"{stem}.{digest}.json"
+        write_atomic(os.path.join(root, name), content)
+        encodings = ['gz']
+        write_atomic(os.path.join(root, name + '.gz'), gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            write_atomic(os.path.join(root, name + '.br'), brotli.compress(content, quality=11))
+            encodings.append('br')
+
+        files[path] = {'file': name, 'hash': digest, 'size': len(content), 'encodings': encodings}
+        if old is not None and old['file'] != name:
+            remove_files(root, old)
+        changed.append(path)
+        if log:
+            log(f"wrote {path} -> {name}")
+
+    # On a full export anything not produced any more (deleted projects,
+    # empty categories) is dropped
+    if full:
+        for path in set(files) - paths:
+            remove_files(root, files.pop(path))
+            changed.append(path)
+
+    if changed or not os.path.exists(os.path.join(root, MANIFEST_NAME)):
+        manifest['generated_at'] = timezone.now().isoformat()
+        write_atomic(os.path.join(root, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return changed
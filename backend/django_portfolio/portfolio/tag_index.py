@@ -0,0 +1,192 @@
+"""
+In-process tag -> project bitmap index.
+
+Each tag maps to a Python int used as a bitset over project ids, so
+"tagged a AND b" is a single `&` and "a OR b" a single `|` no matter how
+many projects there are. The index lives in process memory and is
+checked against two cache generations on every lookup:
+
+- TAGS, bumped by any tag change (new names, renames, deletions), and
+- TAG_INDEX, bumped only by the index itself when tag assignments change.
+
+The process applying an assignment change patches its own index and
+bumps TAG_INDEX atomically; if the bump shows another process changed
+something in between, or any other process sees the bump, the index is
+rebuilt from one query on the next lookup. Other processes see bumps
+right away through a shared cache (REDIS_URL); with the per-process
+default cache they rebuild once the generations expire, within
+API_GENERATION_SECONDS (see portfolio.cache).
+
+The same index serves tag autocomplete: a sorted list of every word
+suffix of every tag name ("book cover", "cover") is searched with bisect,
+and matches are ranked by usage, which is the bitset's population count.
+"""
+import heapq
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import GENERATION_KEY, TAGS, generations, new_generation
+from .db_router import read_primary
+from .models import ProjectTag, Tag
+
+TAG_INDEX = 'tag-index'
+
+# Positions of the set bits in every byte value, for decoding bitsets
+BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+MATCH_ALL = 'all'
+MATCH_ANY = 'any'
+
+
+def tag_key(name):
+    """
+    Form tag names are compared in: case-folded with runs of whitespace
+    collapsed. Both the index and TagFilterBackend's SQL path match on it.
+    """
+    return ' '.join(name.casefold().split())
+
+
+def ids_to_bits(ids):
+    """Bitset with the bits for `ids` set"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for project_id in ids:
+        buffer[project_id >> 3] |= 1 << (project_id & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def bits_to_ids(bits):
+    """Ascending ids of the set bits"""
+    ids = []
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for offset, value in enumerate(data):
+        if value:
+            base = offset << 3
+            ids.extend(base + bit for bit in BYTE_BITS[value])
+    return ids
+
+
+class TagIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generations = None
+        self.tag_ids = {}  # tag_key() of a name -> ids of the tags with that key
+        self.names = {}  # tag id -> tag name
+        self.bits = {}  # tag id -> project id bitset
+        self.usage = {}  # tag id -> number of projects
+        self.prefixes = []  # sorted (word suffix of a tag_key(), tag id)
+
+    @read_primary
+    def rebuild(self):
+        # On the primary, as for cached_data: rows from a lagging replica
+        # would be kept under the new generations until the next bump.
+        # Generations are read first: a change committed while the rows
+        # are being read bumps them again and triggers another rebuild
+        current = generations([TAGS, TAG_INDEX])
+        names = dict(Tag.objects.values_list('id', 'name'))
+        project_ids = {}
+        rows = ProjectTag.objects.values_list('tag_id', 'project_id').iterator(chunk_size=10000)
+        for tag_id, project_id in rows:
+            project_ids.setdefault(tag_id, []).append(project_id)
+
+        tag_ids = {}
+        prefixes = []
+        for tag_id, name in names.items():
+            key = tag_key(name)
+            # Names differing only in case are separate tags matched as one
+            tag_ids.setdefault(key, []).append(tag_id)
+            words = key.split()
+            prefixes.extend((' '.join(words[i:]), tag_id) for i in range(len(words)))
+        prefixes.sort()
+
+        self.names = names
+        self.tag_ids = tag_ids
+        self.bits = {tag_id: ids_to_bits(ids) for tag_id, ids in project_ids.items()}
+        self.usage = {tag_id: len(ids) for tag_id, ids in project_ids.items()}
+        self.prefixes = prefixes
+        self.generations = current
+
+    def ensure_current(self):
+        with self.lock:
+            if self.generations != generations([TAGS, TAG_INDEX]):
+                self.rebuild()
+
+    def match(self, names, mode=MATCH_ALL, limit=None):
+        """
+        Ids of projects tagged with all (or any) of `names`, compared by
+        tag_key(). Unknown names match nothing. Returns None when there are
+        more than `limit` matches.
+        """
+        self.ensure_current()
+        name_bits = []
+        for name in names:
+            bits = 0
+            for tag_id in self.tag_ids.get(tag_key(name), ()):
+                bits |= self.bits.get(tag_id, 0)
+            name_bits.append(bits)
+        if mode == MATCH_ANY:
+            bits = 0
+            for tagged in name_bits:
+                bits |= tagged
+        else:
+            bits = -1 if name_bits else 0
+            for tagged in name_bits:
+                bits &= tagged
+        if limit is not None and bin(bits).count('1') > limit:
+            return None
+        return bits_to_ids(bits)
+
+    @read_primary
+    def refresh_projects(self, project_ids):
+        """Re-read the tag assignments of `project_ids` after they changed"""
+        key = GENERATION_KEY.format(TAG_INDEX)
+        with self.lock:
+            try:
+                bumped = cache.incr(key)
+            except ValueError:
+                cache.set(key, new_generation(), timeout=settings.API_GENERATION_SECONDS)
+                bumped = None
+            if self.generations is None or bumped != self.generations[1] + 1:
+                # Someone else changed tags too; start over on the next lookup
+                self.generations = None
+                return
+
+            before = dict(self.bits)
+            clear = ~ids_to_bits(project_ids)
+            for tag_id in self.bits:
+                self.bits[tag_id] &= clear
+            rows = ProjectTag.objects.filter(project_id__in=project_ids).values_list('tag_id', 'project_id')
+            for tag_id, project_id in rows:
+                self.bits[tag_id] = self.bits.get(tag_id, 0) | 1 << project_id
+            for tag_id, bits in self.bits.items():
+                if before.get(tag_id) != bits:
+                    self.usage[tag_id] = bin(bits).count('1')
+            self.generations = [self.generations[0], bumped]
+
+    def suggest(self, prefix, limit=10):
+        """
+        Tags with a word starting with `prefix` (compared by tag_key()),
+        most used first, as (tag id, name, usage) tuples.
+        """
+        self.ensure_current()
+        prefix = tag_key(prefix)
+        if not prefix:
+            return []
+        matches = set()
+        # (prefix,) sorts before every (prefix..., tag id) entry
+        for entry, tag_id in self.prefixes[bisect_left(self.prefixes, (prefix,)):]:
+            if not entry.startswith(prefix):
+                break
+            matches.add(tag_id)
+        best = heapq.nsmallest(
+            limit, matches, key=lambda tag_id: (-self.usage.get(tag_id, 0), tag_key(self.names[tag_id]))
+        )
+        return [(tag_id, self.names[tag_id], self.usage.get(tag_id, 0)) for tag_id in best]
+
+
+tag_index = TagIndex()
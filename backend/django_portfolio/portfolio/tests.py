@@ -0,0 +1,28 @@
+import importlib
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from portfolio.models import Project
+
+serverless = importlib.import_module('django_portfolio.settings_serverless')
+
+
+@override_settings(
+    ROOT_URLCONF=serverless.ROOT_URLCONF,
+    MIDDLEWARE=serverless.MIDDLEWARE,
+    VIEW_COUNT_FLUSH_SIZE=serverless.VIEW_COUNT_FLUSH_SIZE,
+    VIEW_COUNT_FLUSH_SECONDS=serverless.VIEW_COUNT_FLUSH_SECONDS,
+    SECURE_SSL_REDIRECT=False,
+)
+class ServerlessViewCountTests(TestCase):
+    """The serverless function may be frozen after responding, so views can't wait for a flush"""
+
+    def test_retrieve_writes_view_in_request(self):
+        project = Project.objects.create(
+            title="Poster", slug='poster', category='Print', description="A poster", date='2024'
+        )
+        response = APIClient().get(f'/api/projects/{project.pk}/')
+        self.assertEqual(response.status_code, 200)
+        project.refresh_from_db()
+        self.assertEqual(project.views, 1)
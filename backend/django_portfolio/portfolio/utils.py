@@ -0,0 +1,97 @@
+import calendar
+import re
+import threading
+from datetime import date
+
+from django.db import transaction
+
+DATE_PRECISION_YEAR = 'year'
+DATE_PRECISION_MONTH = 'month'
+DATE_PRECISION_DAY = 'day'
+
+# "jan" -> 1, "january" -> 1, ... so both short and long month names parse
+MONTHS = {}
+for _number in range(1, 13):
+    MONTHS[calendar.month_abbr[_number].lower()] = _number
+    MONTHS[calendar.month_name[_number].lower()] = _number
+MONTHS['sept'] = 9
+
+YEAR_RE = re.compile(r'(?<!\d)(\d{4})(?!\d)')
+ISO_RE = re.compile(r'^(\d{4})-(\d{1,2})(?:-(\d{1,2}))?$')
+WORD_RE = re.compile(r'[A-Za-z]+')
+DAY_RE = re.compile(r'(?<!\d)(\d{1,2})(?:st|nd|rd|th)?(?!\d)')
+
+
+def parse_display_date(value):
+    """
+    Parse a free-text project date ("2023", "Jan 2023", "2023-01-15",
+    "2021 - 2023", ...) into a sortable (date, precision) pair.
+
+    Missing parts are filled with the first day/month so the result sorts
+    correctly against more precise dates. Ranges sort by their end.
+    Returns (None, '') when no year can be found.
+    """
+    if not value:
+        return None, ''
+    text = value.strip()
+
+    match = ISO_RE.match(text)
+    if match:
+        year, month, day = match.groups()
+        try:
+            if day:
+                return date(int(year), int(month), int(day)), DATE_PRECISION_DAY
+            return date(int(year), int(month), 1), DATE_PRECISION_MONTH
+        except ValueError:
+            pass
+
+    years = list(YEAR_RE.finditer(text))
+    if not years:
+        return None, ''
+
+    # Only look at the part describing the last year mentioned, so that
+    # "Mar 2021 - Jan 2023" yields January 2023 rather than March
+    last = years[-1]
+    start = years[-2].end() if len(years) > 1 else 0
+    segment = text[start:last.start()] + ' ' + text[last.end():]
+    year = int(last.group(1))
+
+    month = None
+    for word in WORD_RE.findall(segment):
+        month = MONTHS.get(word.lower(), month)
+    if month is None:
+        return date(year, 1, 1), DATE_PRECISION_YEAR
+
+    day_match = DAY_RE.search(segment)
+    if day_match:
+        try:
+            return date(year, month, int(day_match.group(1))), DATE_PRECISION_DAY
+        except ValueError:
+            pass
+    return date(year, month, 1), DATE_PRECISION_MONTH
+
+
+_pending = threading.local()
+
+
+def on_commit_batched(key, items, callback):
+    """
+    Queue `items` under `key` and call `callback(queued_items)` once when the
+    current transaction commits, so a burst of signals in one transaction
+    (e.g. replacing all tags of a project) triggers a single piece of work.
+    Outside a transaction the callback runs immediately.
+
+    Only meant for callbacks that refresh derived data: items queued in a
+    transaction that rolls back are simply handled with the next commit.
+    """
+    pending = getattr(_pending, 'batches', None)
+    if pending is None:
+        pending = _pending.batches = {}
+    pending.setdefault(key, set()).update(items)
+
+    def flush():
+        queued = pending.pop(key, None)
+        if queued:
+            callback(queued)
+
+    transaction.on_commit(flush)
@@ -1,4 +1,7 @@
 import json
+import tempfile
+import zipfile
+from datetime import date
 from django.utils.text import slugify
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.response import Response
@@ -7,17 +10,27 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
 from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Count
 from django.conf import settings
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from .models import Project, ProjectImage, Tag, ProjectTag, Message, Skill, Journey
+from rest_framework.parsers import MultiPartParser, FormParser
+from .models import Project, ProjectImage, Tag, ProjectTag, Message, Counter, Skill, Journey, SiteSettings
 from .serializers import (
-    ProjectSerializer, ProjectImageSerializer, TagSerializer,
-    MessageSerializer, SkillSerializer, JourneySerializer, UserSerializer
+    ProjectSerializer, ProjectCardSerializer, ProjectDetailSerializer, ProjectImageSerializer, TagSerializer,
+    MessageSerializer, SkillSerializer, JourneySerializer, UserSerializer, SiteSettingsSerializer
 )
 from .permissions import IsAdminUserOrReadOnly
+from .filters import ProjectOrderingFilter, TagFilterBackend, MessageSearchFilter
+from .mixins import SparseFieldsetMixin, CachePolicyMixin
+from .renderers import DATA_PARSER_CLASSES
+from . import cache as data_cache
+from . import http_cache
+from .tag_index import tag_index
+from .counters import record_view
+from .export import EXPORT_FORMATS, stream_export
+from .importer import import_projects
+from .site_settings import get_site_settings
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
@@ -101,18 +114,23 @@ class ChangePasswordView(APIView):
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(CachePolicyMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """API endpoint for projects"""
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [IsAdminUserOrReadOnly]
     lookup_field = 'id'  # Changed from 'slug' to 'id' for easier frontend integration
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, TagFilterBackend, filters.SearchFilter, ProjectOrderingFilter]
     filterset_fields = ['category', 'featured']
-    search_fields = ['title', 'description', 'tags__name']
-    ordering_fields = ['created_at', 'date', 'title']
+    search_fields = ['title', 'description', 'project_tags__tag__name']
+    ordering_fields = ['created_at', 'date', 'date_sort', 'title', 'views', 'popularity']
     ordering = ['-created_at']  # Default ordering
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (MultiPartParser, FormParser) + DATA_PARSER_CLASSES
+    # Project responses show tag names
+    surrogate_keys = (data_cache.TAGS,)
+    surrogate_collection = data_cache.PROJECTS
+    surrogate_object = 'project'
+    private_actions = ('export', 'import_projects')
     
     def get_queryset(self):
         """
@@ -132,34 +150,154 @@ class ProjectViewSet(viewsets.ModelViewSet):
         category = self.request.query_params.get('category', None)
         if category is not None and category.lower() != 'all':
             queryset = queryset.filter(category__iexact=category)
+
+        # Filter by year as a range on the parsed date so it can use the index
+        try:
+            year = int(self.request.query_params.get('year', ''))
+        except ValueError:
+            year = None  # Missing or invalid years are ignored
+        if year is not None and 1 <= year < 9999:
+            queryset = queryset.filter(
+                date_sort__gte=date(year, 1, 1),
+                date_sort__lt=date(year + 1, 1, 1),
+            )
             
         return queryset
     
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return ProjectDetailSerializer
+        return super().get_serializer_class()
+    
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({"request": self.request})
         return context
     
+    def get_surrogate_keys(self, response):
+        groups, objects = super().get_surrogate_keys(response)
+        if self.action == 'retrieve':
+            # Related project cards show those projects' titles and images
+            objects += [http_cache.object_key('project', card['id']) for card in response.data.get('related', ())]
+        return groups, objects
+    
     def list(self, request, *args, **kwargs):
-        # Disable caching for list view to ensure fresh data
+        # Cached until a project changes; view counts and popularity ordering
+        # may lag by PROJECT_LIST_CACHE_SECONDS
+        data = data_cache.cached_data(
+            f"projects:{data_cache.request_cache_key(request)}",
+            [data_cache.PROJECTS],
+            lambda: super(ProjectViewSet, self).list(request, *args, **kwargs).data,
+            timeout=settings.PROJECT_LIST_CACHE_SECONDS,
+        )
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def cards(self, request):
+        """Lightweight project list for gallery cards, read from the project table only"""
+        def build():
+            queryset = self.filter_queryset(self.get_queryset()).only(*ProjectCardSerializer.Meta.columns)
+
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = ProjectCardSerializer(page, many=True, context=self.get_serializer_context())
+                return self.get_paginated_response(serializer.data).data
+
+            return ProjectCardSerializer(queryset, many=True, context=self.get_serializer_context()).data
+
+        data = data_cache.cached_data(
+            f"cards:{data_cache.request_cache_key(request)}",
+            [data_cache.PROJECTS],
+            build,
+            timeout=settings.PROJECT_LIST_CACHE_SECONDS,
+        )
+        return Response(data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        """Stream every project matching the list filters as ?output=csv or ndjson"""
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response({"detail": "output must be csv or ndjson."}, status=status.HTTP_400_BAD_REQUEST)
         queryset = self.filter_queryset(self.get_queryset())
-        
-        # Log the query parameters and result count for debugging
-        print(f"Query params: {request.query_params}")
-        print(f"Found {queryset.count()} projects")
-        
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        fields = ['id', 'title', 'slug', 'category', 'client', 'date', 'date_sort', 'featured',
+                  'tag_names', 'main_image', 'views', 'created_at', 'updated_at']
+        return stream_export(queryset, fields, output, 'projects')
+    
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAdminUser])
+    def import_projects(self, request):
+        """
+        Bulk import from a multipart upload: `manifest` (NDJSON, one project
+        per line) and `images` (ZIP with the files the manifest refers to).
+        Projects whose slug exists are skipped, so uploads can be retried.
+        """
+        manifest = request.FILES.get('manifest')
+        images = request.FILES.get('images')
+        if manifest is None or images is None:
+            return Response({"detail": "Upload a manifest and an images ZIP."}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        # Images are read from the archive by path
+        with tempfile.NamedTemporaryFile(suffix='.zip') as archive:
+            for chunk in images.chunks():
+                archive.write(chunk)
+            archive.flush()
+            if not zipfile.is_zipfile(archive.name):
+                return Response({"detail": "images must be a ZIP file."}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                # Decoded in this process: a process pool would fork the
+                # web worker, and can't run in the serverless function.
+                # Large imports go through `manage.py import_projects`.
+                result = import_projects(manifest, archive.name, workers=1)
+            except ValueError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED if result.created else status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Project counts by category, featured flag and tag for the current filters"""
+        def build():
+            queryset = self.filter_queryset(self.get_queryset()).order_by()
+
+            # One grouped query gives both the category and the featured counts
+            categories = {}
+            featured = {'true': 0, 'false': 0}
+            rows = queryset.values('category', 'featured').annotate(count=Count('id', distinct=True))
+            for row in rows:
+                categories[row['category']] = categories.get(row['category'], 0) + row['count']
+                featured['true' if row['featured'] else 'false'] += row['count']
+
+            tags = (
+                ProjectTag.objects.filter(project__in=queryset.values('id'))
+                .values('tag_id', 'tag__name')
+                .annotate(count=Count('project_id', distinct=True))
+                .order_by('-count', 'tag__name')
+            )
+            return {
+                'total': featured['true'] + featured['false'],
+                'categories': [
+                    {'value': category, 'count': count}
+                    for category, count in sorted(categories.items())
+                ],
+                'featured': featured,
+                'tags': [
+                    {'id': row['tag_id'], 'name': row['tag__name'], 'count': row['count']}
+                    for row in tags
+                ],
+            }
+
+        data = data_cache.cached_data(
+            f"facets:{data_cache.request_cache_key(request)}",
+            [data_cache.PROJECTS, data_cache.TAGS],
+            build,
+        )
+        return Response(data)
     
     def retrieve(self, request, *args, **kwargs):
         # Disable caching for detail view
         instance = self.get_object()
         serializer = self.get_serializer(instance)
+        if not request.user.is_staff:
+            record_view(instance.pk)
         return Response(serializer.data)
     
     def create(self, request, *args, **kwargs):
@@ -192,7 +330,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-class ProjectImageViewSet(viewsets.ModelViewSet):
+class ProjectImageViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """API endpoint for project images"""
     queryset = ProjectImage.objects.all()
     serializer_class = ProjectImageSerializer
@@ -202,38 +340,123 @@ class ProjectImageViewSet(viewsets.ModelViewSet):
     def set_main(self, request, pk=None):
         """Set this image as the main image for its project"""
         image = self.get_object()
-        project = image.project
-        
-        # Set all other images as not main
-        ProjectImage.objects.filter(project=project).update(is_main=False)
         
-        # Set this image as main
-        image.is_main = True
-        image.save()
+        with transaction.atomic():
+            # Set all other images as not main
+            ProjectImage.objects.filter(project_id=image.project_id).update(is_main=False)
+            
+            # Set this image as main (saving it re-syncs Project.main_image)
+            image.is_main = True
+            image.save()
         
         return Response({'status': 'main image set'})
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CachePolicyMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """API endpoint for tags"""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [IsAdminUserOrReadOnly]
+    surrogate_collection = data_cache.TAGS
+    surrogate_object = 'tag'
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
     
-    @method_decorator(cache_page(60*60*24))  # Cache for 24 hours
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        # Cached until a tag changes rather than for a fixed 24 hours
+        data = data_cache.cached_data(
+            f"tags:{data_cache.request_cache_key(request)}",
+            [data_cache.TAGS],
+            lambda: super(TagViewSet, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Tag suggestions for `?q=` by word prefix, most used first"""
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            limit = 10
+        suggestions = tag_index.suggest(request.query_params.get('q', ''), limit)
+        return Response([
+            {'id': tag_id, 'name': name, 'count': count}
+            for tag_id, name, count in suggestions
+        ])
 
-class MessageViewSet(viewsets.ModelViewSet):
+class MessageViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """API endpoint for messages"""
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAdminUser]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, MessageSearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_read']
     ordering_fields = ['created_at']
     
+    def get_bulk_queryset(self, request):
+        """
+        Messages targeted by a bulk action: `ids` from the body, or with
+        `"all": true` everything matching the current filters (?is_read=,
+        ?search=). Returns None when neither is given.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = request.data.get('ids')
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+                return None
+            return queryset.filter(id__in=ids)
+        if request.data.get('all') is True:
+            return queryset
+        return None
+    
+    def bulk_response(self, key, count):
+        return Response({key: count, 'unread': Counter.get_value(Counter.UNREAD_MESSAGES)})
+    
+    def bulk_error(self):
+        return Response(
+            {"detail": "Provide a list of integer \"ids\", or \"all\": true to use the current filters."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        """Mark many messages read in one statement"""
+        queryset = self.get_bulk_queryset(request)
+        if queryset is None:
+            return self.bulk_error()
+        return self.bulk_response('updated', queryset.mark_read())
+    
+    @action(detail=False, methods=['post'])
+    def mark_unread(self, request):
+        """Mark many messages unread in one statement"""
+        queryset = self.get_bulk_queryset(request)
+        if queryset is None:
+            return self.bulk_error()
+        return self.bulk_response('updated', queryset.mark_unread())
+    
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """Delete many messages with set-based statements"""
+        queryset = self.get_bulk_queryset(request)
+        if queryset is None:
+            return self.bulk_error()
+        deleted, _ = queryset.delete()
+        return self.bulk_response('deleted', deleted)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream every message matching the list filters as ?output=csv or ndjson"""
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response({"detail": "output must be csv or ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = ['id', 'name', 'email', 'subject', 'message', 'is_read', 'created_at']
+        return stream_export(queryset, fields, output, 'messages')
+    
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Number of unread messages, read from the maintained counter"""
+        return Response({'unread': Counter.get_value(Counter.UNREAD_MESSAGES)})
+    
     def get_permissions(self):
         """Allow anyone to create a message, but only admins to view/edit/delete"""
         if self.action == 'create':
@@ -258,7 +481,8 @@ class MessageViewSet(viewsets.ModelViewSet):
             {message.message}
             """
             
-            admin_email = settings.DEFAULT_FROM_EMAIL or 'admin@example.com'
+            site = get_site_settings()
+            admin_email = site['contact_email'] or settings.DEFAULT_FROM_EMAIL or 'admin@example.com'
             send_mail(
                 subject,
                 email_body,
@@ -275,7 +499,7 @@ class MessageViewSet(viewsets.ModelViewSet):
             Thank you for reaching out. I have received your message and will get back to you as soon as possible.
             
             Best regards,
-            DesignSpace
+            {site['site_title']}
             """
             
             send_mail(
@@ -293,31 +517,45 @@ class MessageViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-class SkillViewSet(viewsets.ModelViewSet):
+class SkillViewSet(CachePolicyMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """API endpoint for skills"""
     queryset = Skill.objects.all()
     serializer_class = SkillSerializer
     permission_classes = [IsAdminUserOrReadOnly]
+    surrogate_collection = data_cache.SKILLS
+    surrogate_object = 'skill'
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['category']
     ordering_fields = ['order', 'name']
     
-    @method_decorator(cache_page(60*60))  # Cache for 1 hour
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        # Cached until an item changes rather than for a fixed hour
+        data = data_cache.cached_data(
+            f"skills:{data_cache.request_cache_key(request)}",
+            [data_cache.SKILLS],
+            lambda: super(SkillViewSet, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
 
-class JourneyViewSet(viewsets.ModelViewSet):
+class JourneyViewSet(CachePolicyMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """API endpoint for journey items"""
     queryset = Journey.objects.all()
     serializer_class = JourneySerializer
     permission_classes = [IsAdminUserOrReadOnly]
+    surrogate_collection = data_cache.JOURNEY
+    surrogate_object = 'journey'
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['journey_type']
     ordering_fields = ['order', 'date']
     
-    @method_decorator(cache_page(60*60))  # Cache for 1 hour
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        # Cached until an item changes rather than for a fixed hour
+        data = data_cache.cached_data(
+            f"journey:{data_cache.request_cache_key(request)}",
+            [data_cache.JOURNEY],
+            lambda: super(JourneyViewSet, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
 
 class UserViewSet(viewsets.ModelViewSet):
     """API endpoint for users"""
@@ -360,25 +598,52 @@ class UserViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+class BootstrapView(CachePolicyMixin, APIView):
+    """
+    Everything the homepage needs in one response: featured projects,
+    skills, journey and tags. Built in a fixed number of queries and cached
+    as a unit until any of those models changes.
+    """
+    permission_classes = [permissions.AllowAny]
+    surrogate_keys = (data_cache.PROJECTS, data_cache.SKILLS, data_cache.JOURNEY, data_cache.TAGS)
+
+    def get(self, request):
+        context = {'request': request}
+
+        def build():
+            featured = (
+                Project.objects.filter(featured=True)
+                .prefetch_related('images')
+                .order_by('-created_at')
+            )
+            return {
+                'featured_projects': ProjectSerializer(featured, many=True, context=context).data,
+                'skills': SkillSerializer(Skill.objects.all(), many=True, context=context).data,
+                'journey': JourneySerializer(Journey.objects.all(), many=True, context=context).data,
+                'tags': TagSerializer(Tag.objects.all(), many=True, context=context).data,
+            }
+
+        data = data_cache.cached_data(
+            f"bootstrap:{data_cache.request_cache_key(request)}",
+            [data_cache.PROJECTS, data_cache.SKILLS, data_cache.JOURNEY, data_cache.TAGS],
+            build,
+        )
+        return Response(data)
+
 class SiteSettingsView(APIView):
     """API endpoint for site settings"""
     permission_classes = [permissions.IsAdminUser]
     
     def get(self, request):
         """Get site settings"""
-        # You can implement this to fetch settings from a database or file
-        settings = {
-            "site_title": "DesignSpace",
-            "site_description": "A showcase of innovative graphic design work across typography, print, and digital media.",
-            "contact_email": settings.DEFAULT_FROM_EMAIL,
-        }
-        return Response(settings)
+        return Response(get_site_settings())
     
     def post(self, request):
         """Update site settings"""
-        # You can implement this to update settings in a database or file
-        # For now, we'll just return a success message
-        return Response({"detail": "Settings updated successfully."}, status=status.HTTP_200_OK)
+        serializer = SiteSettingsSerializer(SiteSettings.load(), data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
 
 class SessionsView(APIView):
     """API endpoint for managing user sessions"""
@@ -0,0 +1,11 @@
+"""
+Entry point for the API-only serverless function that serves public reads.
+
+Same bridge as vercel_wsgi, but on the trimmed settings_serverless profile.
+"""
+
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_portfolio.settings_serverless')
+
+from vercel_wsgi import application, handler  # noqa: E402,F401
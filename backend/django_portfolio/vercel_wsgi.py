@@ -2,9 +2,11 @@
 WSGI config for django_portfolio project for Vercel deployment.
 """
 
+import base64
+import io
 import os
 import sys
-import json
+from urllib.parse import urlencode
 
 # Add the project directory to the sys.path
 path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -16,67 +18,151 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_portfolio.settings')
 from django.core.wsgi import get_wsgi_application
 application = get_wsgi_application()
 
-# Handler for Vercel serverless function
-def handler(event, context):
-    # Ensure we have proper headers
-    headers = event.get('headers', {})
-    if headers is None:
-        headers = {}
-    
-    # Create a minimal WSGI environment
+# Response bodies of these types go back as text, everything else as base64
+TEXT_CONTENT_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml')
+TEXT_CONTENT_SUFFIXES = ('+json', '+xml')
+
+
+class FileWrapper:
+    """
+    wsgi.file_wrapper that hands the whole file over in a single read, so a
+    FileResponse is copied once instead of block by block and joined again.
+    """
+
+    def __init__(self, filelike, block_size=8192):
+        self.filelike = filelike
+        self.block_size = block_size
+
+    def __iter__(self):
+        data = self.filelike.read()
+        if data:
+            yield data
+
+    def close(self):
+        if hasattr(self.filelike, 'close'):
+            self.filelike.close()
+
+
+def decode_body(event):
+    """Request body of a Vercel event as bytes"""
+    body = event.get('body')
+    if not body:
+        return b''
+    if isinstance(body, str):
+        if event.get('isBase64Encoded') or event.get('encoding') == 'base64':
+            return base64.b64decode(body)
+        return body.encode('utf-8')
+    return bytes(body)
+
+
+def build_environ(event, body):
+    """Translate a Vercel event into a WSGI environ"""
+    headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+
+    path_info = event.get('path') or '/'
+    query = event.get('query') or ''
+    if isinstance(query, dict):
+        query = urlencode(query, doseq=True)
+    if '?' in path_info:
+        path_info, _, path_query = path_info.partition('?')
+        query = query or path_query
+
+    scheme = headers.get('x-forwarded-proto', 'https')
+    host = headers.get('host', 'localhost')
+    forwarded_for = headers.get('x-forwarded-for', '')
     environ = {
-        'wsgi.input': None,
+        'wsgi.input': io.BytesIO(body),
         'wsgi.errors': sys.stderr,
         'wsgi.version': (1, 0),
         'wsgi.multithread': False,
         'wsgi.multiprocess': False,
         'wsgi.run_once': False,
-        'wsgi.url_scheme': headers.get('x-forwarded-proto', 'https'),
-        'REQUEST_METHOD': event.get('method', 'GET'),
-        'PATH_INFO': event.get('path', '/'),
-        'QUERY_STRING': event.get('query', ''),
+        'wsgi.url_scheme': scheme,
+        'wsgi.file_wrapper': FileWrapper,
+        'REQUEST_METHOD': (event.get('method') or 'GET').upper(),
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path_info,
+        'QUERY_STRING': query,
         'CONTENT_TYPE': headers.get('content-type', ''),
-        'CONTENT_LENGTH': headers.get('content-length', '0'),
-        'SERVER_NAME': headers.get('host', 'localhost'),
-        'SERVER_PORT': '443',
+        'CONTENT_LENGTH': str(len(body)),
+        'REMOTE_ADDR': forwarded_for.split(',')[0].strip() or headers.get('x-real-ip', ''),
+        'SERVER_NAME': host.split(':')[0],
+        'SERVER_PORT': headers.get('x-forwarded-port', '443' if scheme == 'https' else '80'),
         'SERVER_PROTOCOL': 'HTTP/1.1',
     }
-    
+
     # Add all headers
     for key, value in headers.items():
         key = key.upper().replace('-', '_')
         if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
             environ[f'HTTP_{key}'] = value
-    
-    # Add request body if present
-    if 'body' in event:
-        body = event['body']
-        if event.get('isBase64Encoded', False):
-            import base64
-            body = base64.b64decode(body)
-        environ['wsgi.input'] = body
-    
-    # Capture the response
-    response_headers = []
-    response_body = []
-    
+    return environ
+
+
+def is_text_response(headers):
+    if 'content-encoding' in headers:
+        return False
+    content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+    return content_type.startswith(TEXT_CONTENT_TYPES) or content_type.endswith(TEXT_CONTENT_SUFFIXES)
+
+
+def call_application(app, event):
+    """Run a WSGI app for one Vercel event and build the function response"""
+    body = decode_body(event)
+    environ = build_environ(event, body)
+
+    response = {}
+    chunks = []
+
     def start_response(status, headers, exc_info=None):
-        response_headers.extend(headers)
-        return response_body.append
-    
-    # Call the WSGI application
-    result = application(environ, start_response)
-    
-    # Process the result
-    for data in result:
-        if isinstance(data, bytes):
-            response_body.append(data.decode('utf-8'))
-        else:
-            response_body.append(data)
-    
-    # Return the response
-    return {
-        'statusCode': int(response_headers[0][1].split(' ')[0]),
-        'headers': dict(response_headers),
-        'body': ''.join(response_body),
+        # Nothing is sent before the app returns, so an error response may
+        # always replace the headers set so far
+        response['status'] = status
+        response['headers'] = headers
+        # Legacy write() callable; just part of the body like any other chunk
+        return chunks.append
+
+    result = app(environ, start_response)
+    try:
+        for chunk in result:
+            if chunk:
+                chunks.append(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+    # A single chunk (the common case) is passed through without copying
+    if len(chunks) == 1:
+        content = chunks[0]
+    else:
+        content = b''.join(chunks)
+    if environ['REQUEST_METHOD'] == 'HEAD':
+        content = b''
+
+    headers = {}
+    multi_value_headers = {}
+    for name, value in response['headers']:
+        headers[name] = value
+        multi_value_headers.setdefault(name, []).append(value)
+
+    result = {
+        'statusCode': int(response['status'].split(' ', 1)[0]),
+        'headers': headers,
+        'multiValueHeaders': multi_value_headers,
     }
+    if is_text_response({name.lower(): value for name, value in headers.items()}):
+        try:
+            result['body'] = bytes(content).decode('utf-8')
+            return result
+        except UnicodeDecodeError:
+            pass
+    # Binary bodies (images, compressed JSON) are only base64 encoded here
+    result['body'] = base64.b64encode(content).decode('ascii')
+    result['isBase64Encoded'] = True
+    result['encoding'] = 'base64'
+    return result
+
+
+# Handler for Vercel serverless function
+def handler(event, context):
+    return call_application(application, event)
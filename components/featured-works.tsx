@@ -13,6 +13,10 @@ interface Project {
     id: number
     image: string
     is_main: boolean
+    width: number | null
+    height: number | null
+    dominant_color: string
+    placeholder: string
   }[]
 }
 
@@ -107,6 +111,15 @@ export default function FeaturedWorks() {
                     <img
                       src={imageUrl || "/placeholder.svg"}
                       alt={project.title}
+                      // Reserve the image's space and show its blurred preview until it loads
+                      width={mainImage?.width || undefined}
+                      height={mainImage?.height || undefined}
+                      loading={index === 0 ? "eager" : "lazy"}
+                      style={{
+                        backgroundColor: mainImage?.dominant_color || undefined,
+                        backgroundImage: mainImage?.placeholder ? `url(${mainImage.placeholder})` : undefined,
+                        backgroundSize: "cover",
+                      }}
                       className="w-full h-auto object-cover transition-transform duration-700 group-hover:scale-105"
                     />
                   </Link>
@@ -48,4 +48,18 @@ export function getApiUrl() {
   
     return handleApiResponse(response)
   }
-  
\ No newline at end of file
+  
+  // Django's Cache-Control and surrogate key headers, passed on by proxy
+  // routes so a CDN in front of Next.js can cache and purge public responses
+  const FORWARDED_CACHE_HEADERS = ["Cache-Control", "Surrogate-Key", "Cache-Tag"]
+
+  export function cacheHeaders(response: Response) {
+    const headers: Record<string, string> = {}
+    for (const name of FORWARDED_CACHE_HEADERS) {
+      const value = response.headers.get(name)
+      if (value) {
+        headers[name] = value
+      }
+    }
+    return headers
+  }